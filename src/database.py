@@ -1,32 +1,34 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
 from .config import settings
+import asyncio
 import logging
+from functools import cache
 
 logger = logging.getLogger(__name__)
 
-# Global MongoDB client
-mongodb_client: AsyncIOMotorClient = None
-
+# Shared MongoDB client, cached per process
+@cache
 def get_mongodb_client() -> AsyncIOMotorClient:
-    """Get MongoDB client instance"""
-    global mongodb_client
-    
-    if mongodb_client is None:
-        try:
-            mongodb_client = AsyncIOMotorClient(
-                settings.MONGODB_URL,
-                maxPoolSize=10,
-                minPoolSize=1,
-                maxIdleTimeMS=45000,
-                waitQueueTimeoutMS=5000,
-                serverSelectionTimeoutMS=5000
-            )
-            logger.info("MongoDB client initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize MongoDB client: {e}")
-            raise
-    
-    return mongodb_client
+    """Get MongoDB client instance, created once on first use"""
+    try:
+        client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=45000,
+            waitQueueTimeoutMS=5000,
+            serverSelectionTimeoutMS=5000,
+            appname="content-processor",
+            compressors=settings.MONGO_COMPRESSORS,
+            zlibCompressionLevel=settings.MONGO_ZLIB_COMPRESSION_LEVEL
+        )
+        logger.info("MongoDB client initialized")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to initialize MongoDB client: {e}")
+        raise
 
 def get_database():
     """Dependency to get database instance"""
@@ -35,11 +37,10 @@ def get_database():
 
 async def close_mongodb_connection():
     """Close MongoDB connection"""
-    global mongodb_client
-    
-    if mongodb_client:
-        mongodb_client.close()
-        mongodb_client = None
+    # Only close a client that was actually created
+    if get_mongodb_client.cache_info().currsize:
+        get_mongodb_client().close()
+        get_mongodb_client.cache_clear()
         logger.info("MongoDB connection closed")
 
 
@@ -52,37 +53,64 @@ class Collections:
     FLASHCARDS = "flashcards"
     USERS = "users"
 
+# Single-field indexes created by earlier releases, now covered by the compound indexes
+SUPERSEDED_INDEXES = {
+    Collections.BOOKS: ["userId_1", "uploadedAt_1"],
+    Collections.QUIZ_SESSIONS: ["userId_1", "completedAt_1"],
+    Collections.FLASHCARDS: ["userId_1", "nextReview_1"]
+}
+
+async def drop_superseded_indexes(db, collection: str, names: list):
+    """Drop the named indexes of a collection, skipping any that don't exist"""
+    for name in names:
+        try:
+            await db[collection].drop_index(name)
+            logger.info(f"Dropped superseded index {collection}.{name}")
+        except OperationFailure:
+            # Already dropped, or never created on this database
+            continue
+
 # Database Indexes
 async def create_indexes(db):
     """Create database indexes for optimal performance"""
     try:
-        # Books collection indexes
-        await db[Collections.BOOKS].create_index("userId")
-        await db[Collections.BOOKS].create_index("uploadedAt")
-        await db[Collections.BOOKS].create_index([("title", "text"), ("content", "text")])
-        
-        # Quizzes collection indexes
-        await db[Collections.QUIZZES].create_index("bookId")
-        await db[Collections.QUIZZES].create_index("createdAt")
+        # One createIndexes command per collection, all collections in parallel
+        indexes = {
+            Collections.BOOKS: [
+                # Compound index serves list_documents' filter + sort as one range scan
+                IndexModel([("user_id", ASCENDING), ("uploaded_at", DESCENDING)]),
+                IndexModel([("title", TEXT), ("content", TEXT)])
+            ],
+            Collections.QUIZZES: [
+                IndexModel([("bookId", ASCENDING)]),
+                IndexModel([("createdAt", ASCENDING)])
+            ],
+            Collections.QUIZ_SESSIONS: [
+                IndexModel([("userId", ASCENDING), ("completedAt", DESCENDING)]),
+                IndexModel([("quizId", ASCENDING)])
+            ],
+            Collections.FLASHCARDS: [
+                IndexModel([("userId", ASCENDING), ("nextReview", ASCENDING)]),
+                IndexModel([("bookId", ASCENDING)])
+            ],
+            Collections.USERS: [
+                IndexModel([("email", ASCENDING)], unique=True)
+            ]
+        }
         
-        # Quiz sessions collection indexes
-        await db[Collections.QUIZ_SESSIONS].create_index("userId")
-        await db[Collections.QUIZ_SESSIONS].create_index("quizId")
-        await db[Collections.QUIZ_SESSIONS].create_index("completedAt")
+        await asyncio.gather(*(
+            db[collection].create_indexes(models)
+            for collection, models in indexes.items()
+        ))
         
-        # Flashcards collection indexes
-        await db[Collections.FLASHCARDS].create_index("userId")
-        await db[Collections.FLASHCARDS].create_index("bookId")
-        await db[Collections.FLASHCARDS].create_index("nextReview")
-        
-        # Users collection indexes
-        await db[Collections.USERS].create_index("email", unique=True)
+        # Drop the old indexes only once their replacements exist
+        await asyncio.gather(*(
+            drop_superseded_indexes(db, collection, names)
+            for collection, names in SUPERSEDED_INDEXES.items()
+        ))
         
         logger.info("✅ Database indexes created successfully")
         
     except Exception as e:
         logger.error(f"❌ Failed to create database indexes: {e}")
-        raise
-
-# Initialize client on module import
-mongodb_client = get_mongodb_client()
\ No newline at end of file
+        raise
\ No newline at end of file
@@ -1,21 +1,48 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
 import uvicorn
+import time
 from typing import List, Optional
+from pydantic import TypeAdapter
 import logging
 
+# orjson is optional, fall back to the stdlib JSON encoder without it
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None
+
 from .config import settings
-from .database import mongodb_client, get_database
+from .database import get_mongodb_client, get_database, close_mongodb_connection
 from .services.document_processor import DocumentProcessor
 from .services.text_extractor import TextExtractor
 from .models.document import DocumentResponse, DocumentUploadResponse
-from .utils.file_validator import validate_file
+from .utils.file_validator import validate_file, validate_stream_size
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The only route accepting file bodies, guarded by UploadSizeLimitMiddleware
+UPLOAD_PATH = "/documents/upload"
+
+# Read uploads in 1MB pieces instead of a single large allocation
+UPLOAD_READ_CHUNK_SIZE = 1024 * 1024
+
+# Validates and serializes document listings in a single pass
+document_list_adapter = TypeAdapter(List[DocumentResponse])
+
+# Health checks reuse the last ping result for this many seconds
+HEALTH_CHECK_CACHE_TTL = 2.0
+_last_ping = (float("-inf"), False)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -23,25 +50,82 @@ async def lifespan(app: FastAPI):
     
     # Test database connection
     try:
-        await mongodb_client.admin.command('ping')
+        client = get_mongodb_client()
+        await client.admin.command('ping')
         logger.info("✅ MongoDB connection successful")
     except Exception as e:
         logger.error(f"❌ MongoDB connection failed: {e}")
         raise
     
+    # Initialize services once per worker
+    # Fork workers from a clean server process instead of this threaded event loop,
+    # importing the extractor there once rather than in every worker
+    mp_context = multiprocessing.get_context("forkserver")
+    mp_context.set_forkserver_preload(["src.services.text_extractor"])
+    app.state.process_pool = ProcessPoolExecutor(
+        max_workers=settings.EXTRACTION_WORKERS,
+        mp_context=mp_context
+    )
+    app.state.document_processor = DocumentProcessor()
+    app.state.text_extractor = TextExtractor(process_pool=app.state.process_pool)
+    
     yield
     
     logger.info("Shutting down Content Processor Service...")
-    mongodb_client.close()
+    # Joining the workers blocks, keep the event loop free for in-flight requests
+    await asyncio.to_thread(app.state.process_pool.shutdown, cancel_futures=True)
+    await close_mongodb_connection()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Learning Platform - Content Processor",
     description="Microservice for document upload, parsing and content processing",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse
 )
 
+class UploadSizeLimitMiddleware:
+    """Pure ASGI guard capping the upload body at MAX_FILE_SIZE, other requests pass straight through"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+        
+        max_size = settings.MAX_FILE_SIZE
+        max_size_mb = max_size / (1024 * 1024)
+        detail = f"Request body exceeds maximum allowed size ({max_size_mb:.1f}MB)"
+        
+        # Reject from Content-Length before the body is read
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > max_size:
+                    response = JSONResponse(status_code=413, content={"detail": detail})
+                    await response(scope, receive, send)
+                    return
+                break
+        
+        # Count what actually arrives, so chunked bodies without Content-Length are capped too
+        received = 0
+        
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, capped_receive, send)
+
+# Added before CORS so CORSMiddleware wraps it and its 413s carry CORS headers
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -51,32 +135,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-document_processor = DocumentProcessor()
-text_extractor = TextExtractor()
+def get_document_processor(request: Request) -> DocumentProcessor:
+    """Dependency to get the worker's DocumentProcessor"""
+    return request.app.state.document_processor
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    try:
-        # Check database connection
-        await mongodb_client.admin.command('ping')
+def get_text_extractor(request: Request) -> TextExtractor:
+    """Dependency to get the worker's TextExtractor"""
+    return request.app.state.text_extractor
+
+async def read_upload(file: UploadFile) -> bytearray:
+    """Read an uploaded file incrementally, aborting once it exceeds MAX_FILE_SIZE"""
+    buffer = bytearray()
+    
+    while chunk := await file.read(UPLOAD_READ_CHUNK_SIZE):
+        buffer.extend(chunk)
         
-        return {
-            "status": "healthy",
-            "service": "content-processor",
-            "version": "1.0.0",
-            "database": "connected"
-        }
+        if len(buffer) > settings.MAX_FILE_SIZE:
+            max_size_mb = settings.MAX_FILE_SIZE / (1024 * 1024)
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds maximum allowed size ({max_size_mb:.1f}MB)"
+            )
+    
+    return buffer
+
+async def ping_database() -> bool:
+    """Ping MongoDB, reusing a recent result so health probes don't hammer it"""
+    global _last_ping
+    
+    checked_at, healthy = _last_ping
+    now = time.monotonic()
+    
+    if now - checked_at < HEALTH_CHECK_CACHE_TTL:
+        return healthy
+    
+    try:
+        client = get_mongodb_client()
+        await client.admin.command('ping')
+        healthy = True
     except Exception as e:
         logger.error(f"Health check failed: {e}")
+        healthy = False
+    
+    _last_ping = (now, healthy)
+    return healthy
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    # Check database connection
+    if not await ping_database():
         raise HTTPException(status_code=503, detail="Service unhealthy")
+    
+    return {
+        "status": "healthy",
+        "service": "content-processor",
+        "version": "1.0.0",
+        "database": "connected"
+    }
 
-@app.post("/documents/upload", response_model=DocumentUploadResponse)
+@app.post(UPLOAD_PATH, response_model=DocumentUploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
     user_id: str = None,  # TODO: Get from JWT token
-    db=Depends(get_database)
+    db=Depends(get_database),
+    text_extractor: TextExtractor = Depends(get_text_extractor),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
 ):
     """Upload and process a document (PDF, EPUB, TXT)"""
     
@@ -84,8 +208,13 @@ async def upload_document(
         # Validate file
         validate_file(file)
         
-        # Read file content
-        content = await file.read()
+        # Binary formats are parsed straight from the spooled upload file,
+        # plain text is read incrementally
+        if file.content_type.startswith("text/"):
+            content = await read_upload(file)
+        else:
+            content = file.file
+            validate_stream_size(content)
         
         # Extract text based on file type
         extracted_text = await text_extractor.extract_text(
@@ -123,7 +252,11 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @app.get("/documents/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: str, db=Depends(get_database)):
+async def get_document(
+    document_id: str,
+    db=Depends(get_database),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
+):
     """Get document by ID"""
     
     try:
@@ -132,7 +265,11 @@ async def get_document(document_id: str, db=Depends(get_database)):
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        return DocumentResponse(**document)
+        # Serialize directly so FastAPI doesn't validate the document a second time
+        return Response(
+            content=DocumentResponse.model_validate(document).model_dump_json(),
+            media_type="application/json"
+        )
         
     except HTTPException:
         # Re-raise HTTP exceptions (like 404) as-is
@@ -146,7 +283,8 @@ async def list_documents(
     user_id: Optional[str] = None,
     limit: int = 20,
     skip: int = 0,
-    db=Depends(get_database)
+    db=Depends(get_database),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
 ):
     """List documents with pagination"""
     
@@ -158,14 +296,22 @@ async def list_documents(
             db=db
         )
         
-        return [DocumentResponse(**doc) for doc in documents]
+        # Serialize directly so FastAPI doesn't validate the list a second time
+        return Response(
+            content=document_list_adapter.dump_json(document_list_adapter.validate_python(documents)),
+            media_type="application/json"
+        )
         
     except Exception as e:
         logger.error(f"Failed to list documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/documents/{document_id}")
-async def delete_document(document_id: str, db=Depends(get_database)):
+async def delete_document(
+    document_id: str,
+    db=Depends(get_database),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
+):
     """Delete document by ID"""
     
     try:
@@ -184,7 +330,11 @@ async def delete_document(document_id: str, db=Depends(get_database)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/documents/{document_id}/reprocess")
-async def reprocess_document(document_id: str, db=Depends(get_database)):
+async def reprocess_document(
+    document_id: str,
+    db=Depends(get_database),
+    document_processor: DocumentProcessor = Depends(get_document_processor)
+):
     """Reprocess document (re-chunk, update metadata)"""
     
     try:
@@ -211,5 +361,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=settings.PORT,
         reload=settings.DEBUG,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
\ No newline at end of file
@@ -1,24 +1,17 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any, Union
-from datetime import datetime
+from pydantic import BaseModel, Field, ConfigDict, BeforeValidator
+from typing import List, Optional, Dict, Any, Union, Annotated
+from datetime import datetime, timezone
 from bson import ObjectId
 
-class PyObjectId(str):
-    """Simple ObjectId type that works with any Pydantic v2 version"""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(ObjectId(v))
+def _validate_object_id(v: Any) -> str:
+    """Validate an ObjectId (or its hex string) and return it as a string"""
+    if not ObjectId.is_valid(v):
+        raise ValueError("Invalid ObjectId")
+    # Round-trip through ObjectId so hex is lowercased and 12-byte ids become hex
+    return str(ObjectId(v))
 
-    @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+# ObjectId serialized as a plain string
+PyObjectId = Annotated[str, BeforeValidator(_validate_object_id)]
 
 class DocumentMetadata(BaseModel):
     """Document metadata model"""
@@ -63,7 +56,7 @@ class Document(BaseModel):
     summary: Optional[str] = None
     chunks: List[DocumentChunk] = []
     user_id: Optional[str] = None
-    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    uploaded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     processed_at: Optional[datetime] = None
     metadata: DocumentMetadata
     status: str = "processing"
@@ -1,15 +1,56 @@
 import re
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+import asyncio
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
 from bson import ObjectId
 import logging
 
+# xxhash is optional, fall back to blake2b for content keys without it
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+    xxhash = None
+
 from ..models.document import Document, DocumentChunk, DocumentMetadata
 from ..config import settings
 from ..database import Collections
 
 logger = logging.getLogger(__name__)
 
+# Pattern used by _clean_text, compiled once
+_SPECIAL_RE = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\']+')
+
+# Same filter as a str.translate table for pure-ASCII text, derived from the pattern
+_SPECIAL_ASCII_TABLE = str.maketrans('', '', ''.join(
+    chr(code) for code in range(128) if _SPECIAL_RE.fullmatch(chr(code))
+))
+
+# Sentence endings used to pick chunk boundaries
+_SENTENCE_END_RE = re.compile(r'[.!?\n]')
+
+# Common English vs Italian words for _detect_language ("in" is shared, so left out)
+_LANGUAGE_RE = re.compile(
+    r'\b(?:(?P<en>the|and|is|to|of|a|that|it|with)|(?P<it>il|di|che|e|la|per|un|è|con))\b',
+    re.IGNORECASE
+)
+
+# Characters of content returned with each document in listings
+LIST_CONTENT_PREVIEW_LENGTH = 200
+
+# (cleaned text, language) results kept per processor, bounded in count and total characters
+ANALYSIS_CACHE_SIZE = 32
+ANALYSIS_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+# Summaries are the first sentences of the text, capped in length
+SUMMARY_SENTENCES = 3
+SUMMARY_MAX_LENGTH = 500
+
 class DocumentProcessor:
     """Service for processing and managing documents"""
     
@@ -17,69 +58,143 @@ class DocumentProcessor:
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
         self.min_chunk_size = settings.MIN_CHUNK_SIZE
+        
+        # LRU of content hash -> (cleaned text, language), shared by worker threads
+        self._analysis_cache: OrderedDict[bytes, Tuple[str, str]] = OrderedDict()
+        self._analysis_cache_chars = 0
+        self._analysis_cache_lock = threading.Lock()
     
     async def process_document(
         self, 
         text: str, 
         filename: str, 
         file_type: str, 
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        use_cache: bool = False
     ) -> Document:
         """Process a document: clean text, extract metadata, create chunks"""
         
         logger.info(f"Processing document: {filename}")
         
         try:
-            # Clean and normalize text
-            cleaned_text = self._clean_text(text)
-            
-            # Extract title from filename or text
-            title = self._extract_title(filename, cleaned_text)
-            
-            # Create metadata
-            metadata = self._create_metadata(
-                cleaned_text, 
-                filename, 
-                file_type, 
-                len(text)
-            )
-            
-            # Create chunks
-            chunks = self._create_chunks(cleaned_text)
-            
-            # Generate summary (placeholder for now)
-            summary = self._generate_summary(cleaned_text)
-            
-            # Create document object
-            document = Document(
-                title=title,
-                content=cleaned_text,
-                summary=summary,
-                chunks=chunks,
-                user_id=user_id,
-                metadata=metadata,
-                processed_at=datetime.utcnow(),
-                status="completed"
+            # Cleaning and chunking are CPU-bound, keep them off the event loop
+            document = await asyncio.to_thread(
+                self._build_document, text, filename, file_type, user_id, use_cache
             )
             
-            logger.info(f"Document processed successfully: {len(chunks)} chunks created")
+            logger.info(f"Document processed successfully: {len(document.chunks)} chunks created")
             return document
             
         except Exception as e:
             logger.error(f"Document processing failed: {e}")
             raise Exception(f"Failed to process document: {str(e)}")
     
+    def _build_document(
+        self, 
+        text: str, 
+        filename: str, 
+        file_type: str, 
+        user_id: Optional[str] = None,
+        use_cache: bool = False
+    ) -> Document:
+        """Clean text, extract metadata and create chunks"""
+        
+        # Clean and normalize text, detect language
+        if use_cache:
+            cleaned_text, language = self._clean_and_detect(text)
+        else:
+            cleaned_text, language = self._analyse_text(text)
+        
+        # Extract title from filename or text
+        title = self._extract_title(filename, cleaned_text)
+        
+        # Create metadata
+        metadata = self._create_metadata(
+            cleaned_text, 
+            filename, 
+            file_type, 
+            len(text),
+            language=language
+        )
+        
+        # Create chunks
+        chunks = self._create_chunks(cleaned_text)
+        
+        # Generate summary (placeholder for now)
+        summary = self._generate_summary(cleaned_text)
+        
+        # Create document object
+        return Document(
+            title=title,
+            content=cleaned_text,
+            summary=summary,
+            chunks=chunks,
+            user_id=user_id,
+            metadata=metadata,
+            processed_at=datetime.now(timezone.utc),
+            status="completed"
+        )
+    
+    def _clean_and_detect(self, text: str) -> Tuple[str, str]:
+        """Clean text and detect its language, memoized on the content hash"""
+        
+        key = self._content_key(text)
+        
+        with self._analysis_cache_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return cached
+        
+        result = self._analyse_text(text)
+        cleaned_text = result[0]
+        
+        if len(cleaned_text) > ANALYSIS_CACHE_MAX_CHARS:
+            return result
+        
+        with self._analysis_cache_lock:
+            if key in self._analysis_cache:
+                return result
+            
+            self._analysis_cache[key] = result
+            self._analysis_cache_chars += len(cleaned_text)
+            
+            while (
+                len(self._analysis_cache) > ANALYSIS_CACHE_SIZE
+                or self._analysis_cache_chars > ANALYSIS_CACHE_MAX_CHARS
+            ):
+                _, (evicted, _) = self._analysis_cache.popitem(last=False)
+                self._analysis_cache_chars -= len(evicted)
+        
+        return result
+    
+    def _analyse_text(self, text: str) -> Tuple[str, str]:
+        """Clean text and detect its language"""
+        cleaned_text = self._clean_text(text)
+        return cleaned_text, self._detect_language(cleaned_text)
+    
+    def _content_key(self, text: str) -> bytes:
+        """Non-cryptographic 128-bit identity key for text content"""
+        data = text.encode('utf-8', 'surrogatepass')
+        
+        if HAS_XXHASH:
+            return xxhash.xxh3_128_digest(data)
+        
+        return hashlib.blake2b(data, digest_size=16).digest()
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text content"""
         
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\']+', '', text)
+        # Remove excessive whitespace (this also collapses line breaks);
+        # split/join does it in a single C pass without per-match replacements
+        text = ' '.join(text.split())
         
-        # Normalize line breaks
-        text = re.sub(r'\n+', '\n', text)
+        # Remove special characters but keep punctuation; translate is a
+        # plain C table lookup, the regex is only needed for non-ASCII text
+        if text.isascii():
+            text = text.translate(_SPECIAL_ASCII_TABLE)
+        else:
+            text = _SPECIAL_RE.sub('', text)
         
         # Strip leading/trailing whitespace
         text = text.strip()
@@ -114,7 +229,8 @@ class DocumentProcessor:
         text: str, 
         filename: str, 
         file_type: str, 
-        file_size: int
+        file_size: int,
+        language: Optional[str] = None
     ) -> DocumentMetadata:
         """Create document metadata"""
         
@@ -124,8 +240,9 @@ class DocumentProcessor:
         # Estimate reading time (average 200 words per minute)
         estimated_reading_time = max(1, word_count // 200)
         
-        # Detect language (basic heuristic)
-        language = self._detect_language(text)
+        # Detect language (basic heuristic) unless already known
+        if language is None:
+            language = self._detect_language(text)
         
         return DocumentMetadata(
             file_type=file_type,
@@ -138,14 +255,15 @@ class DocumentProcessor:
     
     def _detect_language(self, text: str) -> str:
         """Basic language detection"""
-        # Simple heuristic - count common English vs Italian words
-        english_words = ['the', 'and', 'is', 'in', 'to', 'of', 'a', 'that', 'it', 'with']
-        italian_words = ['il', 'di', 'che', 'e', 'la', 'per', 'in', 'un', 'è', 'con']
-        
-        text_lower = text.lower()
+        # Simple heuristic - count common English vs Italian words in one pass
+        en_count = 0
+        it_count = 0
         
-        en_count = sum(1 for word in english_words if f' {word} ' in text_lower)
-        it_count = sum(1 for word in italian_words if f' {word} ' in text_lower)
+        for match in _LANGUAGE_RE.finditer(text):
+            if match.lastgroup == 'en':
+                en_count += 1
+            else:
+                it_count += 1
         
         if en_count > it_count:
             return 'en'
@@ -157,78 +275,87 @@ class DocumentProcessor:
     def _create_chunks(self, text: str) -> List[DocumentChunk]:
         """Split text into chunks for AI processing"""
         
-        chunks = []
         text_length = len(text)
         
         if text_length <= self.chunk_size:
             # Document is small enough to be a single chunk
-            chunk = DocumentChunk(
+            chunks = [DocumentChunk(
                 index=0,
                 content=text,
                 start_position=0,
                 end_position=text_length,
                 word_count=len(text.split()),
                 character_count=text_length
-            )
-            chunks.append(chunk)
+            )]
         else:
-            # Split into multiple chunks with overlap
-            start = 0
-            chunk_index = 0
+            # Split into multiple chunks with overlap, skipping ones that are too small
+            spans = [
+                (start, end, content)
+                for start, end in self._chunk_spans(text)
+                if len(content := text[start:end].strip()) >= self.min_chunk_size
+            ]
             
-            while start < text_length:
-                # Calculate end position
-                end = min(start + self.chunk_size, text_length)
-                
-                # Try to end at a sentence boundary
-                if end < text_length:
-                    # Look for sentence endings within last 100 chars
-                    search_start = max(end - 100, start)
-                    chunk_text = text[search_start:end]
-                    
-                    # Find last sentence ending
-                    sentence_endings = ['.', '!', '?', '\n']
-                    last_sentence_end = -1
-                    
-                    for ending in sentence_endings:
-                        pos = chunk_text.rfind(ending)
-                        if pos > last_sentence_end:
-                            last_sentence_end = pos
-                    
-                    if last_sentence_end > 0:
-                        end = search_start + last_sentence_end + 1
-                
-                # Extract chunk content
-                chunk_content = text[start:end].strip()
-                
-                # Skip if chunk is too small
-                if len(chunk_content) >= self.min_chunk_size:
-                    chunk = DocumentChunk(
-                        index=chunk_index,
-                        content=chunk_content,
-                        start_position=start,
-                        end_position=end,
-                        word_count=len(chunk_content.split()),
-                        character_count=len(chunk_content)
-                    )
-                    chunks.append(chunk)
-                    chunk_index += 1
-                
-                # Move to next chunk with overlap
-                start = max(start + 1, end - self.chunk_overlap)
+            chunks = [
+                DocumentChunk(
+                    index=chunk_index,
+                    content=content,
+                    start_position=start,
+                    end_position=end,
+                    word_count=len(content.split()),
+                    character_count=len(content)
+                )
+                for chunk_index, (start, end, content) in enumerate(spans)
+            ]
         
         logger.info(f"Created {len(chunks)} chunks from text of {text_length} characters")
         return chunks
     
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Compute overlapping (start, end) chunk windows, preferring sentence boundaries"""
+        
+        text_length = len(text)
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
+        
+        # Offsets of every sentence ending, located once for the whole text
+        boundaries = [match.start() for match in _SENTENCE_END_RE.finditer(text)]
+        
+        spans = []
+        start = 0
+        
+        while start < text_length:
+            # Calculate end position
+            end = min(start + chunk_size, text_length)
+            
+            # Try to end at a sentence boundary within the last 100 chars
+            if end < text_length:
+                search_start = max(end - 100, start)
+                idx = bisect_left(boundaries, end) - 1
+                
+                if idx >= 0 and boundaries[idx] > search_start:
+                    end = boundaries[idx] + 1
+            
+            spans.append((start, end))
+            
+            # Move to next chunk with overlap
+            start = max(start + 1, end - chunk_overlap)
+        
+        return spans
+    
     def _generate_summary(self, text: str) -> str:
         """Generate a basic summary (placeholder)"""
-        # For now, just take first few sentences
-        sentences = text.split('. ')
-        summary_sentences = sentences[:3]  # First 3 sentences
-        summary = '. '.join(summary_sentences)
+        # For now, just take first few sentences. Only separators that can
+        # fall inside the length cap matter, so the search never scans past it
+        end = -2
+        for _ in range(SUMMARY_SENTENCES):
+            end = text.find('. ', end + 2, SUMMARY_MAX_LENGTH + 2)
+            if end == -1:
+                break
+        
+        summary = text if end == -1 else text[:end]
         
-        if len(summary) > 500:
-            summary = summary[:500] + "..."
+        if len(summary) > SUMMARY_MAX_LENGTH:
+            summary = summary[:SUMMARY_MAX_LENGTH] + "..."
         
         return summary
     
@@ -236,19 +363,44 @@ class DocumentProcessor:
         """Save document to database"""
         
         try:
-            # Convert to dict for MongoDB
+            # Convert to dict for MongoDB, reusing the id generated by the model
+            doc_id = ObjectId(document.id)
             doc_dict = document.model_dump(by_alias=True, exclude={"id"})
+            doc_dict["_id"] = doc_id
             
             # Insert into database
-            result = await db[Collections.BOOKS].insert_one(doc_dict)
+            await db[Collections.BOOKS].insert_one(doc_dict)
             
-            logger.info(f"Document saved to database with ID: {result.inserted_id}")
-            return result.inserted_id
+            logger.info(f"Document saved to database with ID: {doc_id}")
+            return doc_id
             
         except Exception as e:
             logger.error(f"Failed to save document: {e}")
             raise
     
+    async def save_documents(self, documents: List[Document], db) -> List[ObjectId]:
+        """Save several documents to database in one round-trip"""
+        
+        if not documents:
+            return []
+        
+        try:
+            doc_dicts = []
+            for document in documents:
+                doc_dict = document.model_dump(by_alias=True, exclude={"id"})
+                doc_dict["_id"] = ObjectId(document.id)
+                doc_dicts.append(doc_dict)
+            
+            # Unordered inserts let the server apply them in parallel
+            result = await db[Collections.BOOKS].insert_many(doc_dicts, ordered=False)
+            
+            logger.info(f"Saved {len(result.inserted_ids)} documents to database")
+            return result.inserted_ids
+            
+        except Exception as e:
+            logger.error(f"Failed to save documents: {e}")
+            raise
+    
     async def get_document(self, document_id: str, db) -> Optional[Dict]:
         """Get document by ID"""
         
@@ -280,14 +432,26 @@ class DocumentProcessor:
             if user_id:
                 query["user_id"] = user_id
             
-            # Get documents
-            cursor = db[Collections.BOOKS].find(query).sort("uploaded_at", -1).skip(skip).limit(limit)
+            # Page on the server and leave chunks behind, the listing only
+            # needs the chunk count and a short content preview
+            pipeline = [
+                {"$match": query},
+                {"$sort": {"uploaded_at": -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$addFields": {
+                    "chunks_count": {"$size": {"$ifNull": ["$chunks", []]}},
+                    "content": {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, LIST_CONTENT_PREVIEW_LENGTH]}
+                }},
+                {"$project": {"chunks": 0}}
+            ]
+            
+            cursor = db[Collections.BOOKS].aggregate(pipeline)
             documents = await cursor.to_list(length=limit)
             
             # Add computed fields
             for doc in documents:
                 doc["id"] = str(doc["_id"])
-                doc["chunks_count"] = len(doc.get("chunks", []))
             
             return documents
             
@@ -320,14 +484,16 @@ class DocumentProcessor:
                 text=doc["content"],
                 filename=doc["title"],
                 file_type=doc["metadata"]["file_type"],
-                user_id=doc.get("user_id")
+                user_id=doc.get("user_id"),
+                # Repeated reprocessing of a stored document sees the same content
+                use_cache=True
             )
             
             # Update document
             update_data = {
                 "chunks": [chunk.model_dump() for chunk in processed.chunks],
                 "summary": processed.summary,
-                "processed_at": datetime.utcnow(),
+                "processed_at": datetime.now(timezone.utc),
                 "status": "completed"
             }
             
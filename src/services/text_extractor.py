@@ -1,16 +1,171 @@
 import io
+import os
+import re
+import html
+import codecs
+import asyncio
+import hashlib
 import logging
+import threading
 import pypdf
+import types
+import zlib
 import zipfile
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import repeat
+from operator import attrgetter
+from typing import BinaryIO, Optional, Union
 from docx import Document as DocxDocument
+from ..config import settings
+
+# selectolax is optional, fall back to regex HTML stripping without it
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+    HTMLParser = None
+
+# pypdfium2 (PDFium bindings) is an optional PDF backend, selected by PDF_BACKEND
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+    pdfium = None
+
+# charset-normalizer is optional, fall back to trial decoding without it
+try:
+    from charset_normalizer import from_bytes
+    HAS_CHARSET_NORMALIZER = True
+except ImportError:
+    HAS_CHARSET_NORMALIZER = False
+    from_bytes = None
+
+# python-isal and zlib-ng are optional ZIP inflate backends, selected by ZIP_BACKEND
+try:
+    from isal import isal_zlib
+    HAS_ISAL = True
+except ImportError:
+    HAS_ISAL = False
+    isal_zlib = None
+
+try:
+    from zlib_ng import zlib_ng
+    HAS_ZLIB_NG = True
+except ImportError:
+    HAS_ZLIB_NG = False
+    zlib_ng = None
 
 logger = logging.getLogger(__name__)
 
+# Raw bytes or a seekable binary file object (e.g. UploadFile.file)
+FileContent = Union[bytes, bytearray, BinaryIO]
+
+# Upper bound on threads used to extract EPUB chapters
+EPUB_CHAPTER_WORKERS = 8
+
+# Archive members holding EPUB chapter markup
+EPUB_CONTENT_SUFFIXES = ('.html', '.xhtml', '.htm')
+
+# Formats parsed in the process pool, when one is configured
+PROCESS_POOL_TYPES = frozenset({'application/pdf'})
+
+# Extracted texts kept per extractor for re-uploads, bounded in count and total characters
+EXTRACTION_CACHE_SIZE = 32
+EXTRACTION_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+# PDFs with at least this many pages are split into page ranges across the pool
+PDF_SPLIT_MIN_PAGES = 50
+
+# Byte order marks and their codecs; UTF-32 LE must be checked before UTF-16 LE
+TEXT_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Encodings charset-normalizer may pick for text that is not UTF-8
+TEXT_DETECT_ENCODINGS = ["cp1252", "latin_1", "utf_16"]
+
+# PDFium is not thread-safe, calls into it are serialized within a process
+_pdfium_lock = threading.Lock()
+
+# Regex HTML stripping, used when selectolax is not installed
+_SCRIPT_RE = re.compile(r'<script.*?</script>', re.DOTALL | re.IGNORECASE)
+_STYLE_RE = re.compile(r'<style.*?</style>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def _route_zip_inflate(inflate_zlib) -> None:
+    """Make zipfile inflate members and check CRCs with inflate_zlib, compression stays on zlib"""
+    # zipfile looks up zlib.decompressobj per member but binds crc32 at import
+    zlib_proxy = types.ModuleType(zlib.__name__)
+    zlib_proxy.__dict__.update(zlib.__dict__)
+    zlib_proxy.decompressobj = inflate_zlib.decompressobj
+    zipfile.zlib = zlib_proxy
+    zipfile.crc32 = inflate_zlib.crc32
+
+def _configure_zip_backend(backend: str) -> str:
+    """Route zipfile's inflate through the named backend if it is installed, returning the one in use"""
+    
+    available = {'zlib': zlib, 'isal': isal_zlib if HAS_ISAL else None, 'zlib-ng': zlib_ng if HAS_ZLIB_NG else None}
+    
+    if backend not in available:
+        logger.warning(f"Unknown ZIP_BACKEND '{backend}', using zlib")
+        return 'zlib'
+    
+    if available[backend] is None:
+        logger.warning(f"ZIP_BACKEND '{backend}' is not installed, using zlib")
+        return 'zlib'
+    
+    # This swaps zipfile's decompressor for the whole process, so it's opt-in
+    if backend != 'zlib':
+        _route_zip_inflate(available[backend])
+    
+    return backend
+
+_configure_zip_backend(settings.ZIP_BACKEND)
+
+def _use_pdfium() -> bool:
+    """Whether PDF_BACKEND selects PDFium and pypdfium2 is installed"""
+    return settings.PDF_BACKEND == 'pypdfium2' and HAS_PDFIUM
+
+if settings.PDF_BACKEND not in ('pypdf', 'pypdfium2'):
+    logger.warning(f"Unknown PDF_BACKEND '{settings.PDF_BACKEND}', using pypdf")
+elif settings.PDF_BACKEND == 'pypdfium2' and not HAS_PDFIUM:
+    logger.warning("PDF_BACKEND 'pypdfium2' is not installed, using pypdf")
+
+def _extract_text_in_process(file_content: bytes, filename: str, content_type: str) -> str:
+    """Process pool entry point, must stay at module level to be picklable"""
+    return TextExtractor().extract_text_sync(file_content, filename, content_type)
+
+def _extract_pdf_head_in_process(file_content: bytes, workers: int) -> tuple:
+    """Process pool entry point for the first range of PDF pages, returned with the page count"""
+    return TextExtractor()._extract_pdf_head(file_content, workers)
+
+def _extract_pdf_pages_in_process(file_content: bytes, start: int, stop: int) -> list:
+    """Process pool entry point for one range of PDF pages"""
+    extractor = TextExtractor()
+    pdf = extractor._open_pdf(io.BytesIO(file_content))
+    try:
+        return extractor._extract_pdf_pages(pdf, start, stop)
+    finally:
+        extractor._close_pdf(pdf)
+
 class TextExtractor:
     """Service for extracting text from various file formats"""
     
-    def __init__(self):
+    def __init__(self, process_pool: Optional[Executor] = None):
+        self.process_pool = process_pool
+        
+        # LRU of content hash -> extracted text, shared by worker threads
+        self._text_cache: OrderedDict[bytes, str] = OrderedDict()
+        self._text_cache_chars = 0
+        self._text_cache_lock = threading.Lock()
         self.supported_types = {
             'application/pdf': self._extract_from_pdf,
             'application/epub+zip': self._extract_from_epub,
@@ -21,11 +176,91 @@ class TextExtractor:
     
     async def extract_text(
         self, 
-        file_content: bytes, 
+        file_content: FileContent, 
         filename: str, 
         content_type: str
     ) -> str:
-        """Extract text from file content based on content type"""
+        """Extract text from file content based on content type, reusing text of identical uploads"""
+        
+        if content_type not in self.supported_types:
+            return await self._extract_text_uncached(file_content, filename, content_type)
+        
+        key = await asyncio.to_thread(self._content_key, file_content, content_type)
+        
+        with self._text_cache_lock:
+            cached = self._text_cache.get(key)
+            if cached is not None:
+                self._text_cache.move_to_end(key)
+                logger.info(f"Reusing extracted text for {filename}")
+                return cached
+        
+        text = await self._extract_text_uncached(file_content, filename, content_type)
+        self._cache_text(key, text)
+        return text
+    
+    async def _extract_text_uncached(
+        self, 
+        file_content: FileContent, 
+        filename: str, 
+        content_type: str
+    ) -> str:
+        """Extract text off the event loop, in the process pool for formats listed there"""
+        
+        # Pure-Python parsers hold the GIL, run them in another process
+        if self.process_pool is not None and content_type in PROCESS_POOL_TYPES:
+            data = bytes(await asyncio.to_thread(self._read_bytes, file_content))
+            
+            if content_type == 'application/pdf':
+                return await self._extract_pdf_in_pool(data, filename)
+            
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.process_pool, _extract_text_in_process, data, filename, content_type
+            )
+        
+        # Parsing is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(self.extract_text_sync, file_content, filename, content_type)
+    
+    def _content_key(self, file_content: FileContent, content_type: str) -> bytes:
+        """128-bit blake2b key of the content type and raw file bytes"""
+        
+        if isinstance(file_content, (bytes, bytearray)):
+            digest = hashlib.blake2b(file_content, digest_size=16)
+        else:
+            # Hash file objects in chunks rather than reading them into memory
+            file_content.seek(0)
+            digest = hashlib.file_digest(file_content, lambda: hashlib.blake2b(digest_size=16))
+        
+        digest.update(content_type.encode())
+        return digest.digest()
+    
+    def _cache_text(self, key: bytes, text: str) -> None:
+        """Store extracted text, evicting least recently used entries past the limits"""
+        
+        if len(text) > EXTRACTION_CACHE_MAX_CHARS:
+            return
+        
+        with self._text_cache_lock:
+            if key in self._text_cache:
+                return
+            
+            self._text_cache[key] = text
+            self._text_cache_chars += len(text)
+            
+            while (
+                len(self._text_cache) > EXTRACTION_CACHE_SIZE
+                or self._text_cache_chars > EXTRACTION_CACHE_MAX_CHARS
+            ):
+                _, evicted = self._text_cache.popitem(last=False)
+                self._text_cache_chars -= len(evicted)
+    
+    def extract_text_sync(
+        self, 
+        file_content: FileContent, 
+        filename: str, 
+        content_type: str
+    ) -> str:
+        """Extract text from file content, blocking the calling thread"""
         
         logger.info(f"Extracting text from {filename} (type: {content_type})")
         
@@ -34,9 +269,10 @@ class TextExtractor:
         
         try:
             extractor = self.supported_types[content_type]
-            text = await extractor(file_content, filename)
+            text = extractor(file_content, filename)
             
-            if not text or len(text.strip()) == 0:
+            # isspace checks in place, strip() would copy the whole text
+            if not text or text.isspace():
                 raise ValueError("No text content found in file")
             
             logger.info(f"Successfully extracted {len(text)} characters from {filename}")
@@ -46,60 +282,152 @@ class TextExtractor:
             logger.error(f"Text extraction failed for {filename}: {e}")
             raise Exception(f"Failed to extract text: {str(e)}")
     
-    async def _extract_from_pdf(self, file_content: bytes, filename: str) -> str:
-        """Extract text from PDF file"""
+    async def _extract_pdf_in_pool(self, data: bytes, filename: str) -> str:
+        """Extract a PDF in the process pool, parsing page ranges of large ones in parallel"""
         
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = pypdf.PdfReader(pdf_file)
+            workers = settings.EXTRACTION_WORKERS or os.cpu_count() or 1
+            loop = asyncio.get_running_loop()
             
-            text_content = []
+            # The first worker counts the pages as it parses, so short PDFs are parsed only once
+            head, page_count = await loop.run_in_executor(
+                self.process_pool, _extract_pdf_head_in_process, data, workers
+            )
+            ranges = [head]
             
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(page_text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                    continue
+            # One contiguous range per worker, each worker parses the document once
+            if page_count >= PDF_SPLIT_MIN_PAGES:
+                logger.info(f"Extracting text from {filename} in parallel ({page_count} pages)")
+                step = -(-page_count // workers)
+                ranges += await asyncio.gather(*(
+                    loop.run_in_executor(
+                        self.process_pool, _extract_pdf_pages_in_process, data, start, min(start + step, page_count)
+                    )
+                    for start in range(step, page_count, step)
+                ))
             
-            if not text_content:
-                raise ValueError("No readable text found in PDF")
+            text = self._join_pdf_pages([page for pages in ranges for page in pages])
             
-            return '\n\n'.join(text_content)
+            if text.isspace():
+                raise ValueError("No text content found in file")
+            
+            logger.info(f"Successfully extracted {len(text)} characters from {filename}")
+            return text
+            
+        except Exception as e:
+            logger.error(f"Text extraction failed for {filename}: {e}")
+            raise Exception(f"Failed to extract text: {str(e)}")
+    
+    def _extract_pdf_head(self, data: bytes, workers: int) -> tuple:
+        """Pages of the first of `workers` ranges and the page count, all pages if too few to split"""
+        pdf = self._open_pdf(io.BytesIO(data))
+        try:
+            page_count = self._pdf_page_count(pdf)
+            stop = page_count if page_count < PDF_SPLIT_MIN_PAGES else -(-page_count // workers)
+            return self._extract_pdf_pages(pdf, 0, stop), page_count
+        finally:
+            self._close_pdf(pdf)
+    
+    def _extract_from_pdf(self, file_content: FileContent, filename: str) -> str:
+        """Extract text from PDF file"""
+        
+        try:
+            pdf_file = self._as_stream(file_content)
+            pdf = self._open_pdf(pdf_file)
+            
+            try:
+                pages = self._extract_pdf_pages(pdf, 0, self._pdf_page_count(pdf))
+            finally:
+                self._close_pdf(pdf)
+            
+            return self._join_pdf_pages(pages)
             
         except Exception as e:
             logger.error(f"PDF extraction failed: {e}")
             raise Exception(f"Failed to extract PDF text: {str(e)}")
     
-    async def _extract_from_epub(self, file_content: bytes, filename: str) -> str:
+    def _open_pdf(self, pdf_file: BinaryIO):
+        """Open a PDF with PDFium when PDF_BACKEND selects it, otherwise with pypdf"""
+        if _use_pdfium():
+            with _pdfium_lock:
+                return pdfium.PdfDocument(pdf_file)
+        
+        return pypdf.PdfReader(pdf_file)
+    
+    def _close_pdf(self, pdf) -> None:
+        """Free a PDFium document's native memory, pypdf readers need no closing"""
+        if _use_pdfium():
+            with _pdfium_lock:
+                pdf.close()
+    
+    def _pdf_page_count(self, pdf) -> int:
+        """Number of pages in a document returned by _open_pdf"""
+        if _use_pdfium():
+            with _pdfium_lock:
+                return len(pdf)
+        
+        return len(pdf.pages)
+    
+    def _pdf_page_text(self, pdf, page_num: int) -> str:
+        """Extract the text of one page of a document returned by _open_pdf"""
+        if _use_pdfium():
+            # Close the page and text page here, their finalizers would run outside the lock
+            with _pdfium_lock:
+                page = pdf[page_num]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        return textpage.get_text_range()
+                    finally:
+                        textpage.close()
+                finally:
+                    page.close()
+        
+        return pdf.pages[page_num].extract_text()
+    
+    def _extract_pdf_pages(self, pdf, start: int, stop: int) -> list:
+        """Extract the non-empty text of pages start to stop, skipping unreadable pages"""
+        
+        pages = []
+        for page_num in range(start, stop):
+            try:
+                page_text = self._pdf_page_text(pdf, page_num)
+                if page_text:
+                    pages.append(page_text)
+            except Exception as e:
+                logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+                continue
+        
+        return pages
+    
+    def _join_pdf_pages(self, pages: list) -> str:
+        """Join extracted page texts, raising if there are none"""
+        if not pages:
+            raise ValueError("No readable text found in PDF")
+        
+        return '\n\n'.join(pages)
+    
+    def _extract_from_epub(self, file_content: FileContent, filename: str) -> str:
         """Extract text from EPUB file"""
         
         try:
-            epub_file = io.BytesIO(file_content)
+            epub_file = self._as_stream(file_content)
             
             with zipfile.ZipFile(epub_file, 'r') as zip_file:
-                # Find all HTML/XHTML files in the EPUB
-                html_files = [
-                    name for name in zip_file.namelist() 
-                    if name.endswith(('.html', '.xhtml', '.htm'))
-                ]
+                # Find all HTML/XHTML files in the EPUB from one pass over the central
+                # directory, in the order their data is stored so reads move forward
+                html_files = sorted(
+                    (info for info in zip_file.infolist() if info.filename.endswith(EPUB_CONTENT_SUFFIXES)),
+                    key=attrgetter('header_offset')
+                )
                 
                 if not html_files:
                     raise ValueError("No readable content files found in EPUB")
                 
-                text_content = []
-                
-                for html_file in html_files:
-                    try:
-                        content = zip_file.read(html_file).decode('utf-8')
-                        text = self._extract_text_from_html(content)
-                        if text:
-                            text_content.append(text)
-                    except Exception as e:
-                        logger.warning(f"Failed to extract from {html_file}: {e}")
-                        continue
+                # Chapters are independent, extract them concurrently (map keeps their order)
+                with ThreadPoolExecutor(max_workers=min(EPUB_CHAPTER_WORKERS, len(html_files))) as pool:
+                    chapters = pool.map(self._extract_chapter, repeat(zip_file), html_files)
+                    text_content = [text for text in chapters if text]
                 
                 if not text_content:
                     raise ValueError("No readable text found in EPUB")
@@ -110,12 +438,45 @@ class TextExtractor:
             logger.error(f"EPUB extraction failed: {e}")
             raise Exception(f"Failed to extract EPUB text: {str(e)}")
     
-    async def _extract_from_txt(self, file_content: bytes, filename: str) -> str:
+    def _extract_chapter(self, zip_file: zipfile.ZipFile, html_file: zipfile.ZipInfo) -> str:
+        """Extract the text of one EPUB chapter, empty if it can't be read"""
+        
+        try:
+            # Decode while decompressing, the raw bytes are never held in full
+            with io.TextIOWrapper(zip_file.open(html_file), encoding='utf-8') as entry:
+                content = entry.read()
+            return self._extract_text_from_html(content)
+        except Exception as e:
+            logger.warning(f"Failed to extract from {html_file.filename}: {e}")
+            return ""
+    
+    def _extract_from_txt(self, file_content: FileContent, filename: str) -> str:
         """Extract text from plain text file"""
         
         try:
+            file_content = self._read_bytes(file_content)
+            
+            # A byte order mark names the encoding, decode once
+            for bom, encoding in TEXT_BOMS:
+                if file_content.startswith(bom):
+                    return file_content.decode(encoding)
+            
+            # Most uploads are UTF-8 (ASCII included), try it once before anything else
+            try:
+                return file_content.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+            
+            # The charset detector samples the content instead of decoding all of it per guess;
+            # left unrestricted it reads short Western text as cp1006 or big5, so only the
+            # encodings the ladder below would try are considered
+            if HAS_CHARSET_NORMALIZER:
+                best = from_bytes(bytes(file_content), cp_isolation=TEXT_DETECT_ENCODINGS).best()
+                if best is not None and best.encoding in TEXT_DETECT_ENCODINGS:
+                    return str(best)
+            
             # Try different encodings
-            encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
+            encodings = ['utf-16', 'latin-1', 'cp1252']
             
             for encoding in encodings:
                 try:
@@ -130,26 +491,25 @@ class TextExtractor:
             logger.error(f"Text file extraction failed: {e}")
             raise Exception(f"Failed to extract text file: {str(e)}")
     
-    async def _extract_from_docx(self, file_content: bytes, filename: str) -> str:
+    def _extract_from_docx(self, file_content: FileContent, filename: str) -> str:
         """Extract text from DOCX file"""
         
         try:
-            docx_file = io.BytesIO(file_content)
+            docx_file = self._as_stream(file_content)
             doc = DocxDocument(docx_file)
             
-            text_content = []
-            
             # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content.append(paragraph.text)
+            # python-docx rebuilds .text from the runs on every access, read it once
+            text_content = [
+                text for paragraph in doc.paragraphs
+                if (text := paragraph.text).strip()
+            ]
             
             # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text_content.append(cell.text)
+            text_content += [
+                text for table in doc.tables for row in table.rows for cell in row.cells
+                if (text := cell.text).strip()
+            ]
             
             if not text_content:
                 raise ValueError("No readable text found in DOCX")
@@ -160,27 +520,43 @@ class TextExtractor:
             logger.error(f"DOCX extraction failed: {e}")
             raise Exception(f"Failed to extract DOCX text: {str(e)}")
     
+    def _as_stream(self, file_content: FileContent) -> BinaryIO:
+        """Wrap raw bytes in a stream, or rewind an existing file object"""
+        if isinstance(file_content, (bytes, bytearray)):
+            return io.BytesIO(file_content)
+        
+        file_content.seek(0)
+        return file_content
+    
+    def _read_bytes(self, file_content: FileContent) -> Union[bytes, bytearray]:
+        """Return raw bytes, reading them from a file object if needed"""
+        if isinstance(file_content, (bytes, bytearray)):
+            return file_content
+        
+        file_content.seek(0)
+        return file_content.read()
+    
     def _extract_text_from_html(self, html_content: str) -> str:
         """Extract plain text from HTML content"""
         
         try:
+            if HAS_SELECTOLAX:
+                return self._extract_text_from_html_tree(html_content)
+            
             # Simple HTML text extraction using regex
-            import re
             
             # Remove script and style elements
-            html_content = re.sub(r'<script.*?</script>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-            html_content = re.sub(r'<style.*?</style>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
+            html_content = _SCRIPT_RE.sub('', html_content)
+            html_content = _STYLE_RE.sub('', html_content)
             
             # Remove HTML tags
-            text = re.sub(r'<[^>]+>', '', html_content)
+            text = _TAG_RE.sub('', html_content)
             
             # Decode HTML entities
-            import html
             text = html.unescape(text)
             
             # Clean up whitespace
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip()
+            text = ' '.join(text.split())
             
             return text
             
@@ -188,6 +564,22 @@ class TextExtractor:
             logger.warning(f"HTML text extraction failed: {e}")
             return ""
     
+    def _extract_text_from_html_tree(self, html_content: str) -> str:
+        """Extract plain text from HTML content with selectolax's C parser"""
+        
+        tree = HTMLParser(html_content)
+        
+        # Remove script and style elements
+        for node in tree.css('script, style'):
+            node.decompose()
+        
+        root = tree.body or tree.root
+        if root is None:
+            return ""
+        
+        # Clean up whitespace
+        return ' '.join(root.text().split())
+    
     def get_supported_types(self) -> list:
         """Get list of supported file types"""
         return list(self.supported_types.keys())
@@ -1,5 +1,9 @@
 import os
+import re
+import asyncio
 import logging
+import threading
+from typing import BinaryIO, Iterable, Tuple, Union
 from fastapi import UploadFile, HTTPException
 
 # Import con try/except per gestire libmagic opzionale
@@ -14,10 +18,31 @@ from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# libmagic only needs the file header to identify the MIME type
+MAGIC_HEADER_SIZE = 4096
+
+# Default cap on uploads validated at once by validate_files_batch
+BATCH_VALIDATION_CONCURRENCY = 16
+
+# Loading the magic database is expensive and Magic objects are not safe to
+# share across threads, so each worker thread keeps its own detector
+_magic_local = threading.local()
+
+def _get_magic_detector():
+    """Get this thread's libmagic MIME detector, created on first use"""
+    detector = getattr(_magic_local, 'detector', None)
+    if detector is None:
+        detector = _magic_local.detector = magic.Magic(mime=True)
+    return detector
+
 class FileValidationError(Exception):
     """Custom exception for file validation errors"""
     pass
 
+class FileTooLargeError(FileValidationError):
+    """File exceeds MAX_FILE_SIZE, reported as 413 like the upload size limit"""
+    pass
+
 def validate_file(file: UploadFile) -> None:
     """Validate uploaded file against security and format requirements"""
     
@@ -41,6 +66,9 @@ def validate_file(file: UploadFile) -> None:
         
         logger.info(f"File validation passed for: {file.filename}")
         
+    except FileTooLargeError as e:
+        logger.warning(f"File validation failed: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except FileValidationError as e:
         logger.warning(f"File validation failed: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -59,10 +87,15 @@ def _validate_file_size(file: UploadFile) -> None:
         # For now, skip size validation during upload
         return
     
+    _check_file_size(file_size)
+
+def _check_file_size(file_size: int) -> None:
+    """Raise if a file size exceeds MAX_FILE_SIZE"""
+    
     if file_size > settings.MAX_FILE_SIZE:
         size_mb = file_size / (1024 * 1024)
         max_size_mb = settings.MAX_FILE_SIZE / (1024 * 1024)
-        raise FileValidationError(
+        raise FileTooLargeError(
             f"File size ({size_mb:.1f}MB) exceeds maximum allowed size ({max_size_mb:.1f}MB)"
         )
 
@@ -74,7 +107,7 @@ def _validate_file_extension(filename: str) -> None:
     if not file_ext:
         raise FileValidationError("File must have an extension")
     
-    if file_ext not in settings.ALLOWED_FILE_EXTENSIONS:
+    if file_ext not in settings.ALLOWED_FILE_EXTENSIONS_SET:
         allowed = ", ".join(settings.ALLOWED_FILE_EXTENSIONS)
         raise FileValidationError(
             f"File extension '{file_ext}' not allowed. Allowed extensions: {allowed}"
@@ -86,36 +119,41 @@ def _validate_content_type(content_type: str) -> None:
     if not content_type:
         raise FileValidationError("Content type is required")
     
-    if content_type not in settings.ALLOWED_FILE_TYPES:
+    if content_type not in settings.ALLOWED_FILE_TYPES_SET:
         allowed = ", ".join(settings.ALLOWED_FILE_TYPES)
         raise FileValidationError(
             f"Content type '{content_type}' not allowed. Allowed types: {allowed}"
         )
 
-def validate_file_content(file_content: bytes, filename: str) -> None:
+def validate_file_content(file_content: Union[bytes, memoryview], filename: str) -> None:
     """Validate file content after reading"""
     
     try:
+        file_size = len(file_content)
+        
         # Check file size after reading
-        if len(file_content) > settings.MAX_FILE_SIZE:
-            size_mb = len(file_content) / (1024 * 1024)
-            max_size_mb = settings.MAX_FILE_SIZE / (1024 * 1024)
-            raise FileValidationError(
-                f"File size ({size_mb:.1f}MB) exceeds maximum allowed size ({max_size_mb:.1f}MB)"
-            )
+        _check_file_size(file_size)
         
         # Check if file is not empty
-        if len(file_content) == 0:
+        if file_size == 0:
             raise FileValidationError("File is empty")
         
         # Validate file signature/magic bytes (if libmagic is available)
         if HAS_MAGIC:
             try:
-                detected_type = magic.from_buffer(file_content, mime=True)
-                logger.info(f"Detected MIME type for {filename}: {detected_type}")
+                # Only the header is copied out of the upload buffer
+                header = bytes(memoryview(file_content)[:MAGIC_HEADER_SIZE])
+                
+                # A header matching its extension's signature already identifies
+                # the file, libmagic is only consulted for the rest
+                if _matches_extension_signature(header, filename):
+                    logger.info(f"Signature matches extension for {filename}, skipping libmagic")
+                else:
+                    detected_type = _get_magic_detector().from_buffer(header)
+                    logger.info(f"Detected MIME type for {filename}: {detected_type}")
                 
                 # You can add additional validation based on detected type
-                _validate_magic_bytes(file_content, filename)
+                _validate_magic_bytes(header, filename)
                 
             except Exception as e:
                 logger.warning(f"Could not detect file type for {filename}: {e}")
@@ -125,6 +163,9 @@ def validate_file_content(file_content: bytes, filename: str) -> None:
         
         logger.info(f"File content validation passed for: {filename}")
         
+    except FileTooLargeError as e:
+        logger.warning(f"File content validation failed: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except FileValidationError as e:
         logger.warning(f"File content validation failed: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -132,48 +173,102 @@ def validate_file_content(file_content: bytes, filename: str) -> None:
         logger.error(f"Unexpected error during file content validation: {e}")
         raise HTTPException(status_code=500, detail="File content validation failed")
 
+def validate_stream_size(file_obj: BinaryIO) -> int:
+    """Validate the size of a seekable upload without reading it, returning the size"""
+    
+    try:
+        # Seeking to the end reports the size, the data itself is never read
+        file_size = file_obj.seek(0, os.SEEK_END)
+        file_obj.seek(0)
+        
+        _check_file_size(file_size)
+        return file_size
+        
+    except FileTooLargeError as e:
+        logger.warning(f"File size validation failed: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error during file size validation: {e}")
+        raise HTTPException(status_code=500, detail="File size validation failed")
+
+async def validate_files_batch(
+    files: Iterable[Tuple[Union[bytes, memoryview], str]],
+    max_concurrency: int = BATCH_VALIDATION_CONCURRENCY
+) -> None:
+    """Validate the content of several uploads concurrently, raising on the first failure"""
+    
+    # libmagic releases the GIL, so worker threads overlap its scans; the
+    # semaphore keeps a large batch from occupying every thread at once
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def validate(file_content, filename):
+        async with semaphore:
+            await asyncio.to_thread(validate_file_content, file_content, filename)
+    
+    await asyncio.gather(*(validate(file_content, filename) for file_content, filename in files))
+
+def _signature(prefix: bytes) -> tuple:
+    """Pack a file signature into a (mask, expected) pair over the first 8 bytes"""
+    mask = int.from_bytes(b'\xff' * len(prefix) + b'\x00' * (8 - len(prefix)), 'big')
+    expected = int.from_bytes(prefix.ljust(8, b'\x00'), 'big')
+    return mask, expected
+
+# Common malicious file signatures
+_EXECUTABLE_SIGNATURES = (
+    _signature(b'\x4D\x5A'),  # Windows executable (PE)
+    _signature(b'\x7F\x45\x4C\x46'),  # Linux executable (ELF)
+    _signature(b'\xCA\xFE\xBA\xBE'),  # Java class file
+    _signature(b'\xFE\xED\xFA\xCE'),  # Mach-O binary (macOS)
+)
+
+# Expected signature per extension; EPUB and DOCX are both ZIP containers
+_EXTENSION_SIGNATURES = {
+    '.pdf': (*_signature(b'%PDF-'), "File does not appear to be a valid PDF"),
+    '.epub': (*_signature(b'PK'), "File does not appear to be a valid EPUB"),
+    '.docx': (*_signature(b'PK'), "File does not appear to be a valid DOCX"),
+}
+
+def _header_int(file_content: bytes) -> int:
+    """Pack the first 8 bytes into one integer to compare signatures against"""
+    return int.from_bytes(file_content[:8].ljust(8, b'\x00'), 'big')
+
+def _matches_extension_signature(file_content: bytes, filename: str) -> bool:
+    """Check that the file's extension has a known signature and its header matches it"""
+    
+    signature = _EXTENSION_SIGNATURES.get(os.path.splitext(filename)[1].lower())
+    if signature is None:
+        return False
+    
+    mask, expected, _ = signature
+    return _header_int(file_content) & mask == expected
+
 def _validate_magic_bytes(file_content: bytes, filename: str) -> None:
     """Validate file based on magic bytes/signature"""
     
-    # Check for common malicious file signatures
-    malicious_signatures = [
-        b'\x4D\x5A',  # Windows executable (PE)
-        b'\x7F\x45\x4C\x46',  # Linux executable (ELF)
-        b'\xCA\xFE\xBA\xBE',  # Java class file
-        b'\xFE\xED\xFA\xCE',  # Mach-O binary (macOS)
-    ]
+    # Pack the header once and compare every signature against the same integer
+    head = _header_int(file_content)
     
-    for signature in malicious_signatures:
-        if file_content.startswith(signature):
+    for mask, expected in _EXECUTABLE_SIGNATURES:
+        if head & mask == expected:
             raise FileValidationError(f"File appears to be an executable, which is not allowed")
     
     # Validate specific file type signatures
     file_ext = os.path.splitext(filename)[1].lower()
+    signature = _EXTENSION_SIGNATURES.get(file_ext)
     
-    if file_ext == '.pdf':
-        if not file_content.startswith(b'%PDF-'):
-            raise FileValidationError("File does not appear to be a valid PDF")
-    
-    elif file_ext == '.epub':
-        # EPUB files are ZIP files with specific structure
-        if not file_content.startswith(b'PK'):
-            raise FileValidationError("File does not appear to be a valid EPUB")
-    
-    elif file_ext == '.docx':
-        # DOCX files are also ZIP files
-        if not file_content.startswith(b'PK'):
-            raise FileValidationError("File does not appear to be a valid DOCX")
+    if signature is not None:
+        mask, expected, message = signature
+        if head & mask != expected:
+            raise FileValidationError(message)
+
+# Path separators, characters reserved on Windows and control characters, in one pass
+_UNSAFE_FILENAME_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f\x7f-\x9f]+')
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe storage"""
     
-    import re
-    
-    # Remove path separators and special characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '', filename)
-    
-    # Remove control characters
-    sanitized = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', sanitized)
+    # Remove path separators, special characters and control characters
+    sanitized = _UNSAFE_FILENAME_RE.sub('', filename)
     
     # Limit length
     if len(sanitized) > 255:
@@ -186,14 +281,17 @@ def sanitize_filename(filename: str) -> str:
     
     return sanitized
 
-def get_file_info(file_content: bytes, filename: str) -> dict:
+def get_file_info(file_content: Union[bytes, memoryview], filename: str) -> dict:
     """Get file information for logging/debugging"""
     
+    file_size = len(file_content)
+    
     return {
         "filename": filename,
-        "size_bytes": len(file_content),
-        "size_mb": round(len(file_content) / (1024 * 1024), 2),
+        "size_bytes": file_size,
+        "size_mb": round(file_size / (1024 * 1024), 2),
         "extension": os.path.splitext(filename)[1].lower(),
-        "is_empty": len(file_content) == 0,
-        "first_bytes": file_content[:20].hex() if len(file_content) >= 20 else file_content.hex()
+        "is_empty": file_size == 0,
+        # The hex dump is only useful when debug logging is on
+        "first_bytes": file_content[:20].hex() if logger.isEnabledFor(logging.DEBUG) else None
     }
\ No newline at end of file
@@ -8,8 +8,7 @@ from httpx import AsyncClient
 class TestHealthEndpoint:
     """Basic health endpoint test"""
     
-    @pytest.mark.asyncio
-    async def test_health_check_example(self):
+    def test_health_check_example(self):
         """Example health check test"""
         # This is a placeholder test
         # Replace with actual health check test when src/main.py is available
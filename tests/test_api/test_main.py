@@ -1,25 +1,93 @@
 import pytest
-from unittest.mock import patch, AsyncMock, MagicMock
-from httpx import AsyncClient
-from bson import ObjectId
+from unittest.mock import AsyncMock, MagicMock, Mock
+from fastapi import HTTPException
 import io
+from types import SimpleNamespace
+from starlette.datastructures import State
 
-from src.main import app
+from tests.conftest import FROZEN_OID, FROZEN_OID_STR, SAMPLE_TEXT, SAMPLE_TEXT_BYTES
+from src.main import app, lifespan, read_upload, ping_database, get_document_processor, get_text_extractor
+from src.database import get_database
+from src.config import settings
 from src.models.document import Document, DocumentMetadata
+from src.services.document_processor import DocumentProcessor
+from src.services.text_extractor import TextExtractor
+
+@pytest.fixture
+def patched_main():
+    """Swap the database and services the route handlers depend on for mocks"""
+    fake = SimpleNamespace(
+        db=MagicMock(),
+        document_processor=MagicMock(),
+        text_extractor=MagicMock()
+    )
+    app.dependency_overrides.update({
+        get_database: lambda: fake.db,
+        get_document_processor: lambda: fake.document_processor,
+        get_text_extractor: lambda: fake.text_extractor
+    })
+    yield fake
+    app.dependency_overrides.clear()
+
+@pytest.fixture(autouse=True)
+def reset_health_cache(monkeypatch):
+    """Make every test start with an expired database ping"""
+    monkeypatch.setattr("src.main._last_ping", (float("-inf"), False))
+
+@pytest.fixture
+def mock_mongo_client(monkeypatch):
+    """Serve a mock MongoDB client that answers pings"""
+    mock_client = Mock()
+    mock_client.admin.command = AsyncMock(return_value={"ok": 1})
+    monkeypatch.setattr("src.main.get_mongodb_client", lambda: mock_client)
+    return mock_client
+
+class TestLifespan:
+    """Test suite for application startup and shutdown"""
+    
+    async def test_lifespan_attaches_services_to_app_state(self, monkeypatch, mock_mongo_client):
+        """Test that startup creates the per-worker services"""
+        # Arrange
+        mock_close = AsyncMock()
+        monkeypatch.setattr(app, "state", State())
+        monkeypatch.setattr("src.main.close_mongodb_connection", mock_close)
+        
+        # Act
+        async with lifespan(app):
+            processor = app.state.document_processor
+            extractor = app.state.text_extractor
+            pool = app.state.process_pool
+        
+        # Assert
+        assert isinstance(processor, DocumentProcessor)
+        assert isinstance(extractor, TextExtractor)
+        assert extractor.process_pool is pool
+        mock_close.assert_awaited_once()
+    
+    async def test_lifespan_process_pool_uses_forkserver(self, monkeypatch, mock_mongo_client):
+        """Test that startup forks pool workers from a preloaded forkserver and shuts them down"""
+        # Arrange
+        mock_pool_class = MagicMock()
+        monkeypatch.setattr(app, "state", State())
+        monkeypatch.setattr("src.main.close_mongodb_connection", AsyncMock())
+        monkeypatch.setattr("src.main.ProcessPoolExecutor", mock_pool_class)
+        
+        # Act
+        async with lifespan(app):
+            pass
+        
+        # Assert
+        mp_context = mock_pool_class.call_args.kwargs["mp_context"]
+        assert mp_context.get_start_method() == "forkserver"
+        mock_pool_class.return_value.shutdown.assert_called_once_with(cancel_futures=True)
 
 class TestHealthEndpoint:
     """Test suite for health check endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_health_check_success(self):
+    async def test_health_check_success(self, client, mock_mongo_client):
         """Test successful health check"""
-        # Arrange
-        with patch('src.main.mongodb_client') as mock_client:
-            mock_client.admin.command = AsyncMock(return_value={"ok": 1})
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get("/health")
+        # Act
+        response = await client.get("/health")
         
         # Assert
         assert response.status_code == 200
@@ -29,54 +97,57 @@ class TestHealthEndpoint:
         assert data["version"] == "1.0.0"
         assert data["database"] == "connected"
     
-    @pytest.mark.asyncio
-    async def test_health_check_database_failure(self):
+    async def test_health_check_database_failure(self, client, mock_mongo_client):
         """Test health check with database connection failure"""
         # Arrange
-        with patch('src.main.mongodb_client') as mock_client:
-            mock_client.admin.command = AsyncMock(side_effect=Exception("Connection failed"))
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get("/health")
+        mock_mongo_client.admin.command.side_effect = Exception("Connection failed")
+        
+        # Act
+        response = await client.get("/health")
         
         # Assert
         assert response.status_code == 503
         data = response.json()
         assert "Service unhealthy" in data["detail"]
 
+    async def test_ping_database_reuses_recent_result(self, mock_mongo_client):
+        """Test that repeated health checks within the TTL ping MongoDB only once"""
+        # Act
+        first = await ping_database()
+        second = await ping_database()
+        
+        # Assert
+        assert first is True
+        assert second is True
+        mock_mongo_client.admin.command.assert_awaited_once_with('ping')
+
 class TestDocumentUploadEndpoint:
     """Test suite for document upload endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_upload_document_success(self, sample_text):
+    async def test_upload_document_success(self, client, patched_main):
         """Test successful document upload"""
         # Arrange
-        file_content = sample_text.encode('utf-8')
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.text_extractor') as mock_extractor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            # Setup mocks
-            mock_extractor.extract_text = AsyncMock(return_value=sample_text)
-            
-            mock_processed_doc = MagicMock()
-            mock_processed_doc.chunks = [MagicMock(), MagicMock()]  # 2 chunks
-            mock_processor.process_document = AsyncMock(return_value=mock_processed_doc)
-            mock_processor.save_document = AsyncMock(return_value=ObjectId())
-            
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.post(
-                    "/documents/upload",
-                    files={
-                        "file": ("test.txt", io.BytesIO(file_content), "text/plain")
-                    },
-                    params={"user_id": "test_user_123"}
-                )
+        file_content = SAMPLE_TEXT_BYTES
+        
+        mock_processor = patched_main.document_processor
+        mock_extractor = patched_main.text_extractor
+        
+        # Setup mocks
+        mock_extractor.extract_text = AsyncMock(return_value=SAMPLE_TEXT)
+        
+        mock_processed_doc = MagicMock()
+        mock_processed_doc.chunks = [MagicMock(), MagicMock()]  # 2 chunks
+        mock_processor.process_document = AsyncMock(return_value=mock_processed_doc)
+        mock_processor.save_document = AsyncMock(return_value=FROZEN_OID)
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={
+                "file": ("test.txt", io.BytesIO(file_content), "text/plain")
+            },
+            params={"user_id": "test_user_123"}
+        )
         
         # Assert
         assert response.status_code == 200
@@ -87,54 +158,184 @@ class TestDocumentUploadEndpoint:
         assert data["chunks_count"] == 2
         assert data["message"] == "Document uploaded and processed successfully"
     
-    @pytest.mark.asyncio
-    async def test_upload_document_invalid_file_type(self):
+    async def test_upload_document_binary_passes_spooled_file(self, client, patched_main):
+        """Test that binary uploads are size-checked and extracted from the spooled file"""
+        # Arrange
+        file_content = b"PK\x03\x04 fake docx content"
+        docx_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        
+        mock_processor = patched_main.document_processor
+        mock_extractor = patched_main.text_extractor
+        extracted_from = []
+        
+        async def record_stream(content, filename, content_type):
+            # The spooled file is closed after the request, inspect it during the call
+            extracted_from.append((type(content), content.tell(), content.read()))
+            return SAMPLE_TEXT
+        
+        mock_extractor.extract_text = AsyncMock(side_effect=record_stream)
+        mock_processed_doc = MagicMock()
+        mock_processed_doc.chunks = [MagicMock()]
+        mock_processor.process_document = AsyncMock(return_value=mock_processed_doc)
+        mock_processor.save_document = AsyncMock(return_value=FROZEN_OID)
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={"file": ("test.docx", io.BytesIO(file_content), docx_type)}
+        )
+        
+        # Assert
+        assert response.status_code == 200
+        content_type, position, data = extracted_from[0]
+        assert not issubclass(content_type, (bytes, bytearray))
+        assert position == 0
+        assert data == file_content
+    
+    async def test_upload_document_binary_stream_over_limit_returns_413(self, client, patched_main, monkeypatch):
+        """Test that an oversized binary upload of unknown size is rejected by the stream check"""
+        # Arrange
+        file_content = b"%PDF-1.4 " + b"A" * 200
+        mock_extractor = patched_main.text_extractor
+        mock_extractor.extract_text = AsyncMock(return_value=SAMPLE_TEXT)
+        # The request passes the middleware, and validate_file is skipped as for an
+        # upload whose size isn't known up front, so only the stream check can catch it
+        monkeypatch.setattr('src.main.validate_file', Mock())
+        monkeypatch.setattr('src.utils.file_validator.settings', SimpleNamespace(MAX_FILE_SIZE=100))
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={"file": ("test.pdf", io.BytesIO(file_content), "application/pdf")}
+        )
+        
+        # Assert
+        assert response.status_code == 413
+        assert response.json()["detail"].startswith("File size")
+        mock_extractor.extract_text.assert_not_called()
+    
+    async def test_upload_document_invalid_file_type(self, client):
         """Test document upload with invalid file type"""
         # Arrange
         file_content = b"fake content"
         
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            # Act
-            response = await client.post(
-                "/documents/upload",
-                files={
-                    "file": ("test.exe", io.BytesIO(file_content), "application/x-executable")
-                }
-            )
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={
+                "file": ("test.exe", io.BytesIO(file_content), "application/x-executable")
+            }
+        )
         
         # Assert
         assert response.status_code == 400
         data = response.json()
         assert "not allowed" in data["detail"]
     
-    @pytest.mark.asyncio
-    async def test_upload_document_no_file(self):
+    async def test_upload_document_no_file(self, client):
         """Test document upload without file"""
-        # Arrange
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            # Act
-            response = await client.post("/documents/upload")
+        # Act
+        response = await client.post("/documents/upload")
         
         # Assert
         assert response.status_code == 422  # Validation error
     
-    @pytest.mark.asyncio
-    async def test_upload_document_processing_failure(self, sample_text):
+    async def test_upload_document_too_large_rejected_by_content_length(self, client, patched_main, monkeypatch):
+        """Test that uploads larger than MAX_FILE_SIZE are rejected before processing"""
+        # Arrange
+        file_content = SAMPLE_TEXT_BYTES
+        mock_extractor = patched_main.text_extractor
+        mock_extractor.extract_text = AsyncMock(return_value=SAMPLE_TEXT)
+        monkeypatch.setattr(settings, 'MAX_FILE_SIZE', 64)
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={
+                "file": ("test.txt", io.BytesIO(file_content), "text/plain")
+            }
+        )
+        
+        # Assert
+        assert response.status_code == 413
+        assert "exceeds maximum allowed size" in response.json()["detail"]
+        mock_extractor.extract_text.assert_not_called()
+    
+    async def test_upload_document_too_large_keeps_cors_headers(self, client, monkeypatch):
+        """Test that the early size rejection still reaches browsers with CORS headers"""
+        # Arrange
+        monkeypatch.setattr(settings, 'MAX_FILE_SIZE', 64)
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={"file": ("test.txt", io.BytesIO(SAMPLE_TEXT_BYTES), "text/plain")},
+            headers={"Origin": "http://localhost:3000"}
+        )
+        
+        # Assert
+        assert response.status_code == 413
+        assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    
+    async def test_upload_document_chunked_body_over_limit_rejected(self, client, patched_main, monkeypatch):
+        """Test that a body sent without Content-Length is capped while it streams in"""
+        # Arrange
+        mock_extractor = patched_main.text_extractor
+        mock_extractor.extract_text = AsyncMock(return_value=SAMPLE_TEXT)
+        monkeypatch.setattr(settings, 'MAX_FILE_SIZE', 64)
+        boundary = b"testboundary"
+        body = (
+            b"--" + boundary + b"\r\n"
+            b'Content-Disposition: form-data; name="file"; filename="test.txt"\r\n'
+            b"Content-Type: text/plain\r\n\r\n" + SAMPLE_TEXT_BYTES + b"\r\n"
+            b"--" + boundary + b"--\r\n"
+        )
+        
+        async def chunked_body():
+            for start in range(0, len(body), 32):
+                yield body[start:start + 32]
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            content=chunked_body(),
+            headers={"Content-Type": "multipart/form-data; boundary=testboundary"}
+        )
+        
+        # Assert
+        assert response.status_code == 413
+        assert "exceeds maximum allowed size" in response.json()["detail"]
+        mock_extractor.extract_text.assert_not_called()
+    
+    async def test_read_upload_aborts_when_limit_exceeded(self, monkeypatch):
+        """Test that incremental upload reads stop once MAX_FILE_SIZE is exceeded"""
+        # Arrange
+        upload = Mock()
+        upload.read = AsyncMock(side_effect=[b"A" * 40, b"A" * 40, b""])
+        monkeypatch.setattr(settings, 'MAX_FILE_SIZE', 64)
+        
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await read_upload(upload)
+        
+        assert exc_info.value.status_code == 413
+        assert upload.read.await_count == 2
+    
+    async def test_upload_document_processing_failure(self, client, patched_main):
         """Test document upload with processing failure"""
         # Arrange
-        file_content = sample_text.encode('utf-8')
-        
-        with patch('src.main.text_extractor') as mock_extractor:
-            mock_extractor.extract_text = AsyncMock(side_effect=Exception("Extraction failed"))
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.post(
-                    "/documents/upload",
-                    files={
-                        "file": ("test.txt", io.BytesIO(file_content), "text/plain")
-                    }
-                )
+        file_content = SAMPLE_TEXT_BYTES
+        
+        mock_extractor = patched_main.text_extractor
+        mock_extractor.extract_text = AsyncMock(side_effect=Exception("Extraction failed"))
+        
+        # Act
+        response = await client.post(
+            "/documents/upload",
+            files={
+                "file": ("test.txt", io.BytesIO(file_content), "text/plain")
+            }
+        )
         
         # Assert
         assert response.status_code == 500
@@ -144,23 +345,18 @@ class TestDocumentUploadEndpoint:
 class TestGetDocumentEndpoint:
     """Test suite for get document endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_get_document_success(self, sample_document_dict):
+    async def test_get_document_success(self, client, sample_document_dict, patched_main):
         """Test successful document retrieval"""
         # Arrange
-        document_id = str(sample_document_dict["_id"])
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            sample_document_dict["id"] = document_id
-            sample_document_dict["chunks_count"] = 1
-            mock_processor.get_document = AsyncMock(return_value=sample_document_dict)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get(f"/documents/{document_id}")
+        document_id = FROZEN_OID_STR
+        
+        mock_processor = patched_main.document_processor
+        sample_document_dict["id"] = document_id
+        sample_document_dict["chunks_count"] = 1
+        mock_processor.get_document = AsyncMock(return_value=sample_document_dict)
+        
+        # Act
+        response = await client.get(f"/documents/{document_id}")
         
         # Assert
         assert response.status_code == 200
@@ -169,42 +365,16 @@ class TestGetDocumentEndpoint:
         assert data["title"] == sample_document_dict["title"]
         assert "chunks_count" in data
     
-    @pytest.mark.asyncio
-    async def test_get_document_not_found(self):
-        """Test document retrieval for non-existent document"""
-        # Arrange
-        document_id = str(ObjectId())
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.get_document = AsyncMock(return_value=None)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get(f"/documents/{document_id}")
-        
-        # Assert
-        assert response.status_code == 404
-        data = response.json()
-        assert "Document not found" in data["detail"]
-    
-    @pytest.mark.asyncio
-    async def test_get_document_invalid_id(self):
+    async def test_get_document_invalid_id(self, client, patched_main):
         """Test document retrieval with invalid ObjectId"""
         # Arrange
         invalid_id = "invalid_objectid"
         
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.get_document = AsyncMock(side_effect=Exception("Invalid ObjectId"))
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get(f"/documents/{invalid_id}")
+        mock_processor = patched_main.document_processor
+        mock_processor.get_document = AsyncMock(side_effect=Exception("Invalid ObjectId"))
+        
+        # Act
+        response = await client.get(f"/documents/{invalid_id}")
         
         # Assert
         assert response.status_code == 500
@@ -212,8 +382,7 @@ class TestGetDocumentEndpoint:
 class TestListDocumentsEndpoint:
     """Test suite for list documents endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_list_documents_success(self, document_builder):
+    async def test_list_documents_success(self, client, document_builder, patched_main):
         """Test successful document listing"""
         # Arrange
         doc1 = document_builder.with_title("Document 1").build_dict()
@@ -226,15 +395,11 @@ class TestListDocumentsEndpoint:
         
         mock_documents = [doc1, doc2]
         
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.list_documents = AsyncMock(return_value=mock_documents)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get("/documents")
+        mock_processor = patched_main.document_processor
+        mock_processor.list_documents = AsyncMock(return_value=mock_documents)
+        
+        # Act
+        response = await client.get("/documents")
         
         # Assert
         assert response.status_code == 200
@@ -243,21 +408,16 @@ class TestListDocumentsEndpoint:
         assert data[0]["title"] == "Document 1"
         assert data[1]["title"] == "Document 2"
     
-    @pytest.mark.asyncio
-    async def test_list_documents_with_filters(self):
+    async def test_list_documents_with_filters(self, client, patched_main):
         """Test document listing with user_id filter"""
         # Arrange
         user_id = "test_user_123"
         
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.list_documents = AsyncMock(return_value=[])
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get(f"/documents?user_id={user_id}&limit=10&skip=5")
+        mock_processor = patched_main.document_processor
+        mock_processor.list_documents = AsyncMock(return_value=[])
+        
+        # Act
+        response = await client.get(f"/documents?user_id={user_id}&limit=10&skip=5")
         
         # Assert
         assert response.status_code == 200
@@ -269,19 +429,14 @@ class TestListDocumentsEndpoint:
         assert call_args['skip'] == 5
         assert 'db' in call_args  # Just verify db was passed
     
-    @pytest.mark.asyncio
-    async def test_list_documents_empty_result(self):
+    async def test_list_documents_empty_result(self, client, patched_main):
         """Test document listing with empty result"""
         # Arrange
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.list_documents = AsyncMock(return_value=[])
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get("/documents")
+        mock_processor = patched_main.document_processor
+        mock_processor.list_documents = AsyncMock(return_value=[])
+        
+        # Act
+        response = await client.get("/documents")
         
         # Assert
         assert response.status_code == 200
@@ -291,89 +446,58 @@ class TestListDocumentsEndpoint:
 class TestDeleteDocumentEndpoint:
     """Test suite for delete document endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_delete_document_success(self):
+    async def test_delete_document_success(self, client, patched_main, fresh_oid):
         """Test successful document deletion"""
         # Arrange
-        document_id = str(ObjectId())
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.delete_document = AsyncMock(return_value=True)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.delete(f"/documents/{document_id}")
+        document_id = fresh_oid
+        
+        mock_processor = patched_main.document_processor
+        mock_processor.delete_document = AsyncMock(return_value=True)
+        
+        # Act
+        response = await client.delete(f"/documents/{document_id}")
         
         # Assert
         assert response.status_code == 200
         data = response.json()
         assert data["message"] == "Document deleted successfully"
-    
-    @pytest.mark.asyncio
-    async def test_delete_document_not_found(self):
-        """Test document deletion for non-existent document"""
-        # Arrange
-        document_id = str(ObjectId())
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.delete_document = AsyncMock(return_value=False)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.delete(f"/documents/{document_id}")
-        
-        # Assert
-        assert response.status_code == 404
-        data = response.json()
-        assert "Document not found" in data["detail"]
 
 class TestReprocessDocumentEndpoint:
     """Test suite for reprocess document endpoint"""
     
-    @pytest.mark.asyncio
-    async def test_reprocess_document_success(self):
+    async def test_reprocess_document_success(self, client, patched_main, fresh_oid):
         """Test successful document reprocessing"""
         # Arrange
-        document_id = str(ObjectId())
+        document_id = fresh_oid
         reprocess_result = {"chunks_count": 5}
         
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.reprocess_document = AsyncMock(return_value=reprocess_result)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.post(f"/documents/{document_id}/reprocess")
+        mock_processor = patched_main.document_processor
+        mock_processor.reprocess_document = AsyncMock(return_value=reprocess_result)
+        
+        # Act
+        response = await client.post(f"/documents/{document_id}/reprocess")
         
         # Assert
         assert response.status_code == 200
         data = response.json()
         assert data["message"] == "Document reprocessed successfully"
         assert data["chunks_count"] == 5
+
+class TestDocumentNotFound:
+    """Test suite for endpoints addressing a missing document"""
     
-    @pytest.mark.asyncio
-    async def test_reprocess_document_not_found(self):
-        """Test document reprocessing for non-existent document"""
+    @pytest.mark.parametrize("method,path_suffix,processor_method,missing", [
+        ("get", "", "get_document", None),
+        ("delete", "", "delete_document", False),
+        ("post", "/reprocess", "reprocess_document", None),
+    ])
+    async def test_missing_document_returns_404(self, client, patched_main, fresh_oid, method, path_suffix, processor_method, missing):
+        """Test that document endpoints answer 404 when the processor finds nothing"""
         # Arrange
-        document_id = str(ObjectId())
-        
-        with patch('src.main.document_processor') as mock_processor, \
-             patch('src.main.get_database') as mock_get_db:
-            
-            mock_processor.reprocess_document = AsyncMock(return_value=None)
-            mock_get_db.return_value = MagicMock()
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.post(f"/documents/{document_id}/reprocess")
+        setattr(patched_main.document_processor, processor_method, AsyncMock(return_value=missing))
+        
+        # Act
+        response = await client.request(method.upper(), f"/documents/{fresh_oid}{path_suffix}")
         
         # Assert
         assert response.status_code == 404
@@ -383,29 +507,20 @@ class TestReprocessDocumentEndpoint:
 class TestCORSMiddleware:
     """Test suite for CORS middleware"""
     
-    @pytest.mark.asyncio
-    async def test_cors_headers_present(self):
+    async def test_cors_headers_present(self, client, mock_mongo_client):
         """Test that CORS headers are present in responses"""
-        # Arrange
-        with patch('src.main.mongodb_client') as mock_client:
-            mock_client.admin.command = AsyncMock(return_value={"ok": 1})
-            
-            async with AsyncClient(app=app, base_url="http://test") as client:
-                # Act
-                response = await client.get("/health")
+        # Act
+        response = await client.get("/health")
         
         # Assert
         assert response.status_code == 200
         # FastAPI with CORS middleware should include appropriate headers
         # The exact headers depend on the request, but we can check it doesn't fail
     
-    @pytest.mark.asyncio
-    async def test_options_request_handled(self):
+    async def test_options_request_handled(self, client):
         """Test that OPTIONS preflight requests are handled"""
-        # Arrange
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            # Act
-            response = await client.options("/health")
+        # Act
+        response = await client.options("/health")
         
         # Assert
         # OPTIONS requests should be handled by CORS middleware
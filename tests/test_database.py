@@ -1,109 +1,138 @@
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
-from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConnectionFailure
+from unittest.mock import Mock, AsyncMock
+from types import SimpleNamespace
+from collections import defaultdict
+from pymongo.errors import OperationFailure
 
 from src.database import (
     get_mongodb_client,
     get_database,
     close_mongodb_connection,
     create_indexes,
+    drop_superseded_indexes,
     Collections
 )
 
+# Client options expected for the db_settings fixture values
+EXPECTED_MOTOR_KWARGS = dict(
+    maxPoolSize=256,
+    minPoolSize=10,
+    maxIdleTimeMS=45000,
+    waitQueueTimeoutMS=5000,
+    serverSelectionTimeoutMS=5000,
+    appname="content-processor",
+    compressors="zstd,snappy,zlib",
+    zlibCompressionLevel=6
+)
+
+@pytest.fixture(autouse=True)
+def reset_mongodb_client():
+    """Start and finish every test without a cached client"""
+    get_mongodb_client.cache_clear()
+    yield
+    get_mongodb_client.cache_clear()
+
+@pytest.fixture(scope="session")
+def motor_mock_factory():
+    """Build fresh Motor client doubles with the used attributes wired up"""
+    def make():
+        client = Mock()
+        client.__getitem__ = Mock()
+        client.admin.command = AsyncMock(return_value={"ok": 1})
+        return client
+    return make
+
+@pytest.fixture
+def mock_motor(monkeypatch, motor_mock_factory):
+    """Replace the Motor client class, the created client is its return_value"""
+    client_class = Mock(return_value=motor_mock_factory())
+    monkeypatch.setattr('src.database.AsyncIOMotorClient', client_class)
+    return client_class
+
+@pytest.fixture
+def db_settings(monkeypatch):
+    """Plain settings namespace read by the database module"""
+    stub = SimpleNamespace(
+        MONGODB_URL="mongodb://test:27017/test",
+        DATABASE_NAME="test_database",
+        MONGO_MAX_POOL_SIZE=256,
+        MONGO_MIN_POOL_SIZE=10,
+        MONGO_COMPRESSORS="zstd,snappy,zlib",
+        MONGO_ZLIB_COMPRESSION_LEVEL=6
+    )
+    monkeypatch.setattr('src.database.settings', stub)
+    return stub
+
 class TestMongoDBClient:
     """Test suite for MongoDB client management"""
     
-    def test_get_mongodb_client_creates_client(self):
+    def test_get_mongodb_client_creates_client(self, mock_motor):
         """Test that get_mongodb_client creates and returns client"""
-        # Arrange
-        with patch('src.database.mongodb_client', None):
-            with patch('src.database.AsyncIOMotorClient') as mock_client_class:
-                mock_client_instance = MagicMock()
-                mock_client_class.return_value = mock_client_instance
-                
-                # Act
-                result = get_mongodb_client()
+        # Act
+        result = get_mongodb_client()
         
         # Assert
-        assert result == mock_client_instance
-        mock_client_class.assert_called_once()
+        assert result is mock_motor.return_value
+        mock_motor.assert_called_once()
     
-    def test_get_mongodb_client_returns_existing_client(self):
+    def test_get_mongodb_client_returns_existing_client(self, mock_motor):
         """Test that get_mongodb_client returns existing client if available"""
         # Arrange
-        existing_client = MagicMock()
+        existing_client = get_mongodb_client()
         
-        with patch('src.database.mongodb_client', existing_client):
-            # Act
-            result = get_mongodb_client()
+        # Act
+        result = get_mongodb_client()
         
         # Assert
-        assert result == existing_client
+        assert result is existing_client
+        mock_motor.assert_called_once()
     
-    def test_get_mongodb_client_with_correct_parameters(self):
+    def test_get_mongodb_client_with_correct_parameters(self, mock_motor, db_settings):
         """Test that MongoDB client is created with correct parameters"""
-        # Arrange
-        with patch('src.database.mongodb_client', None):
-            with patch('src.database.AsyncIOMotorClient') as mock_client_class:
-                with patch('src.database.settings') as mock_settings:
-                    mock_settings.MONGODB_URL = "mongodb://test:27017/test"
-                    
-                    # Act
-                    get_mongodb_client()
+        # Act
+        get_mongodb_client()
         
         # Assert
-        mock_client_class.assert_called_once_with(
-            "mongodb://test:27017/test",
-            maxPoolSize=10,
-            minPoolSize=1,
-            maxIdleTimeMS=45000,
-            waitQueueTimeoutMS=5000,
-            serverSelectionTimeoutMS=5000
-        )
+        mock_motor.assert_called_once_with("mongodb://test:27017/test", **EXPECTED_MOTOR_KWARGS)
     
-    def test_get_mongodb_client_handles_initialization_error(self):
+    def test_get_mongodb_client_handles_initialization_error(self, mock_motor):
         """Test that get_mongodb_client handles initialization errors properly"""
         # Arrange
-        with patch('src.database.mongodb_client', None):
-            with patch('src.database.AsyncIOMotorClient', side_effect=Exception("Connection failed")):
-                # Act & Assert
-                with pytest.raises(Exception) as exc_info:
-                    get_mongodb_client()
-                assert "Connection failed" in str(exc_info.value)
+        mock_motor.side_effect = Exception("Connection failed")
+        
+        # Act & Assert
+        with pytest.raises(Exception) as exc_info:
+            get_mongodb_client()
+        assert "Connection failed" in str(exc_info.value)
 
 class TestGetDatabase:
     """Test suite for database dependency function"""
     
-    def test_get_database_returns_database_instance(self):
+    def test_get_database_returns_database_instance(self, monkeypatch, db_settings, motor_mock_factory):
         """Test that get_database returns correct database instance"""
         # Arrange
-        mock_client = MagicMock()
-        mock_database = MagicMock()
+        mock_client = motor_mock_factory()
+        mock_database = Mock()
         mock_client.__getitem__.return_value = mock_database
+        monkeypatch.setattr('src.database.get_mongodb_client', lambda: mock_client)
+        db_settings.DATABASE_NAME = "test_db"
         
-        with patch('src.database.get_mongodb_client', return_value=mock_client):
-            with patch('src.database.settings') as mock_settings:
-                mock_settings.DATABASE_NAME = "test_db"
-                
-                # Act
-                result = get_database()
+        # Act
+        result = get_database()
         
         # Assert
         assert result == mock_database
         mock_client.__getitem__.assert_called_once_with("test_db")
     
-    def test_get_database_uses_correct_database_name(self):
+    def test_get_database_uses_correct_database_name(self, monkeypatch, db_settings, motor_mock_factory):
         """Test that get_database uses the correct database name from settings"""
         # Arrange
-        mock_client = MagicMock()
+        mock_client = motor_mock_factory()
+        monkeypatch.setattr('src.database.get_mongodb_client', lambda: mock_client)
+        db_settings.DATABASE_NAME = "learning_platform"
         
-        with patch('src.database.get_mongodb_client', return_value=mock_client):
-            with patch('src.database.settings') as mock_settings:
-                mock_settings.DATABASE_NAME = "learning_platform"
-                
-                # Act
-                get_database()
+        # Act
+        get_database()
         
         # Assert
         mock_client.__getitem__.assert_called_once_with("learning_platform")
@@ -111,146 +140,183 @@ class TestGetDatabase:
 class TestCloseMongoDBConnection:
     """Test suite for closing MongoDB connection"""
     
-    @pytest.mark.asyncio
-    async def test_close_mongodb_connection_closes_existing_client(self):
+    async def test_close_mongodb_connection_closes_existing_client(self, mock_motor):
         """Test that close_mongodb_connection closes existing client"""
         # Arrange
-        mock_client = MagicMock()
+        mock_client = get_mongodb_client()
         
-        with patch('src.database.mongodb_client', mock_client):
-            # Act
-            await close_mongodb_connection()
+        # Act
+        await close_mongodb_connection()
         
         # Assert
         mock_client.close.assert_called_once()
+        assert get_mongodb_client.cache_info().currsize == 0
     
-    @pytest.mark.asyncio
-    async def test_close_mongodb_connection_handles_no_client(self):
+    async def test_close_mongodb_connection_handles_no_client(self, mock_motor):
         """Test that close_mongodb_connection handles case with no client"""
-        # Arrange
-        with patch('src.database.mongodb_client', None):
-            # Act & Assert - should not raise
-            await close_mongodb_connection()
+        # Act & Assert - should not raise
+        await close_mongodb_connection()
+        
+        # Closing must not create a client just to close it
+        mock_motor.assert_not_called()
 
 
 class TestCollections:
     """Test suite for Collections class"""
     
-    def test_collections_constants_exist(self):
-        """Test that all expected collection constants exist"""
-        # Assert
-        assert hasattr(Collections, 'BOOKS')
-        assert hasattr(Collections, 'QUIZZES')
-        assert hasattr(Collections, 'QUIZ_SESSIONS')
-        assert hasattr(Collections, 'FLASHCARDS')
-        assert hasattr(Collections, 'USERS')
-    
-    def test_collections_values_are_strings(self):
-        """Test that collection constants have expected string values"""
+    def test_collections_constants(self):
+        """Test that all expected collection constants exist with their names"""
+        # Arrange
+        names = ("BOOKS", "QUIZZES", "QUIZ_SESSIONS", "FLASHCARDS", "USERS")
+        
+        # Act
+        constants = {name: getattr(Collections, name, None) for name in names}
+        
         # Assert
-        assert Collections.BOOKS == "books"
-        assert Collections.QUIZZES == "quizzes"
-        assert Collections.QUIZ_SESSIONS == "quiz_sessions"
-        assert Collections.FLASHCARDS == "flashcards"
-        assert Collections.USERS == "users"
+        assert constants == {
+            "BOOKS": "books",
+            "QUIZZES": "quizzes",
+            "QUIZ_SESSIONS": "quiz_sessions",
+            "FLASHCARDS": "flashcards",
+            "USERS": "users"
+        }
+
+def _index_specs(collection_mock):
+    """Collect (keys, options) for every IndexModel passed to create_indexes"""
+    specs = []
+    for call in collection_mock.create_indexes.call_args_list:
+        for model in call[0][0]:
+            document = dict(model.document)
+            keys = list(document.pop("key").items())
+            document.pop("name")
+            specs.append((keys, document))
+    return specs
 
 class TestCreateIndexes:
     """Test suite for database index creation"""
     
-    @pytest.mark.asyncio
     async def test_create_indexes_creates_all_indexes(self):
         """Test that create_indexes creates all required indexes"""
         # Arrange
-        mock_db = MagicMock()
+        mock_db = Mock()
+        collections = defaultdict(AsyncMock)
+        mock_db.__getitem__ = Mock(side_effect=collections.__getitem__)
         
-        # Mock collections
-        mock_books = AsyncMock()
-        mock_quizzes = AsyncMock()
-        mock_quiz_sessions = AsyncMock()
-        mock_flashcards = AsyncMock()
-        mock_users = AsyncMock()
-        
-        mock_db.__getitem__.side_effect = lambda col: {
-            "books": mock_books,
-            "quizzes": mock_quizzes,
-            "quiz_sessions": mock_quiz_sessions,
-            "flashcards": mock_flashcards,
-            "users": mock_users
-        }[col]
+        expected = {
+            "books": [
+                ([("user_id", 1), ("uploaded_at", -1)], {}),
+                ([("title", "text"), ("content", "text")], {})
+            ],
+            "quizzes": [([("bookId", 1)], {}), ([("createdAt", 1)], {})],
+            "quiz_sessions": [
+                ([("userId", 1), ("completedAt", -1)], {}),
+                ([("quizId", 1)], {})
+            ],
+            "flashcards": [
+                ([("userId", 1), ("nextReview", 1)], {}),
+                ([("bookId", 1)], {})
+            ],
+            "users": [([("email", 1)], {"unique": True})]
+        }
+        
+        # Act
+        await create_indexes(mock_db)
+        
+        # Assert - one comparison, a failure shows the full per-collection diff
+        actual = {name: _index_specs(collection) for name, collection in collections.items()}
+        assert actual == expected
+    
+    async def test_create_indexes_batches_one_call_per_collection(self):
+        """Test that each collection receives a single create_indexes batch"""
+        # Arrange
+        mock_db = Mock()
+        collections = defaultdict(AsyncMock)
+        mock_db.__getitem__ = Mock(side_effect=collections.__getitem__)
         
         # Act
         await create_indexes(mock_db)
         
-        # Assert - Books collection indexes
-        mock_books.create_index.assert_any_call("userId")
-        mock_books.create_index.assert_any_call("uploadedAt")
-        mock_books.create_index.assert_any_call([("title", "text"), ("content", "text")])
+        # Assert
+        assert len(collections) == 5
+        for collection in collections.values():
+            collection.create_indexes.assert_awaited_once()
+            collection.create_index.assert_not_called()
+    
+    async def test_create_indexes_drops_superseded_single_field_indexes(self):
+        """Test that the single-field indexes replaced by compound ones are dropped"""
+        # Arrange
+        mock_db = Mock()
+        collections = defaultdict(AsyncMock)
+        mock_db.__getitem__ = Mock(side_effect=collections.__getitem__)
         
-        # Assert - Quizzes collection indexes
-        mock_quizzes.create_index.assert_any_call("bookId")
-        mock_quizzes.create_index.assert_any_call("createdAt")
+        # Act
+        await create_indexes(mock_db)
         
-        # Assert - Quiz sessions collection indexes
-        mock_quiz_sessions.create_index.assert_any_call("userId")
-        mock_quiz_sessions.create_index.assert_any_call("quizId")
-        mock_quiz_sessions.create_index.assert_any_call("completedAt")
+        # Assert
+        dropped = {
+            name: [call[0][0] for call in collection.drop_index.call_args_list]
+            for name, collection in collections.items()
+            if collection.drop_index.called
+        }
+        assert dropped == {
+            "books": ["userId_1", "uploadedAt_1"],
+            "quiz_sessions": ["userId_1", "completedAt_1"],
+            "flashcards": ["userId_1", "nextReview_1"]
+        }
+    
+    async def test_drop_superseded_indexes_skips_missing_indexes(self):
+        """Test that indexes already gone don't stop the remaining drops"""
+        # Arrange
+        mock_db = Mock()
+        mock_collection = AsyncMock()
+        mock_collection.drop_index.side_effect = [OperationFailure("index not found with name [userId_1]"), None]
+        mock_db.__getitem__ = Mock(return_value=mock_collection)
         
-        # Assert - Flashcards collection indexes
-        mock_flashcards.create_index.assert_any_call("userId")
-        mock_flashcards.create_index.assert_any_call("bookId")
-        mock_flashcards.create_index.assert_any_call("nextReview")
+        # Act
+        await drop_superseded_indexes(mock_db, "books", ["userId_1", "uploadedAt_1"])
         
-        # Assert - Users collection indexes
-        mock_users.create_index.assert_any_call("email", unique=True)
+        # Assert
+        assert mock_collection.drop_index.await_count == 2
     
-    @pytest.mark.asyncio
     async def test_create_indexes_handles_creation_error(self):
         """Test that create_indexes handles index creation errors"""
         # Arrange
-        mock_db = MagicMock()
+        mock_db = Mock()
         mock_collection = AsyncMock()
-        mock_collection.create_index.side_effect = Exception("Index creation failed")
-        mock_db.__getitem__.return_value = mock_collection
+        mock_collection.create_indexes.side_effect = Exception("Index creation failed")
+        mock_db.__getitem__ = Mock(return_value=mock_collection)
         
         # Act & Assert
         with pytest.raises(Exception) as exc_info:
             await create_indexes(mock_db)
         assert "Index creation failed" in str(exc_info.value)
     
-    @pytest.mark.asyncio
     async def test_create_indexes_books_text_index(self):
         """Test that books collection gets compound text index"""
         # Arrange
-        mock_db = MagicMock()
+        mock_db = Mock()
         mock_books = AsyncMock()
-        mock_db.__getitem__.return_value = mock_books
+        mock_db.__getitem__ = Mock(return_value=mock_books)
         
         # Act
         await create_indexes(mock_db)
         
         # Assert - Check that compound text index is created
-        expected_text_index = [("title", "text"), ("content", "text")]
-        mock_books.create_index.assert_any_call(expected_text_index)
+        expected_text_index = ([("title", "text"), ("content", "text")], {})
+        assert expected_text_index in _index_specs(mock_books)
     
-    @pytest.mark.asyncio
     async def test_create_indexes_users_unique_email(self):
         """Test that users collection gets unique email index"""
         # Arrange
-        mock_db = MagicMock()
-        mock_users = AsyncMock()
-        
-        def get_collection(name):
-            if name == "users":
-                return mock_users
-            return AsyncMock()
-        
-        mock_db.__getitem__.side_effect = get_collection
+        mock_db = Mock()
+        collections = defaultdict(AsyncMock)
+        mock_db.__getitem__ = Mock(side_effect=collections.__getitem__)
         
         # Act
         await create_indexes(mock_db)
         
         # Assert - Check that unique email index is created
-        mock_users.create_index.assert_any_call("email", unique=True)
+        assert ([("email", 1)], {"unique": True}) in _index_specs(collections["users"])
 
 class TestDatabaseIntegration:
     """Integration tests for database functionality"""
@@ -264,50 +330,32 @@ class TestDatabaseIntegration:
         # Assert
         assert client1 is client2  # Same instance
     
-    @pytest.mark.asyncio
-    async def test_database_workflow_integration(self):
+    async def test_database_workflow_integration(self, mock_motor):
         """Test complete database workflow integration"""
         # Arrange
-        mock_client = MagicMock()
-        mock_client.admin.command = AsyncMock(return_value={"ok": 1})
-        mock_database = MagicMock()
+        mock_client = mock_motor.return_value
+        mock_database = Mock()
         mock_client.__getitem__.return_value = mock_database
         
-        with patch('src.database.AsyncIOMotorClient', return_value=mock_client):
-            with patch('src.database.mongodb_client', None):  # Reset singleton
-                # Act
-                client = get_mongodb_client()
-                database = get_database()
-                await close_mongodb_connection()
+        # Act
+        client = get_mongodb_client()
+        database = get_database()
+        await close_mongodb_connection()
         
         # Assert
         assert client == mock_client
         assert database == mock_database
         mock_client.close.assert_called_once()
     
-    def test_database_settings_integration(self):
+    def test_database_settings_integration(self, mock_motor, db_settings):
         """Test database functions use settings correctly"""
         # Arrange
-        with patch('src.database.settings') as mock_settings:
-            mock_settings.MONGODB_URL = "mongodb://test:27017/test"
-            mock_settings.DATABASE_NAME = "test_database"
-            
-            with patch('src.database.mongodb_client', None):
-                with patch('src.database.AsyncIOMotorClient') as mock_client_class:
-                    mock_client = MagicMock()
-                    mock_client_class.return_value = mock_client
-                    
-                    # Act
-                    get_mongodb_client()
-                    get_database()
+        mock_client = mock_motor.return_value
+        
+        # Act
+        get_mongodb_client()
+        get_database()
         
         # Assert
-        mock_client_class.assert_called_once_with(
-            "mongodb://test:27017/test",
-            maxPoolSize=10,
-            minPoolSize=1,
-            maxIdleTimeMS=45000,
-            waitQueueTimeoutMS=5000,
-            serverSelectionTimeoutMS=5000
-        )
-        mock_client.__getitem__.assert_called_once_with("test_database")
\ No newline at end of file
+        mock_motor.assert_called_once_with("mongodb://test:27017/test", **EXPECTED_MOTOR_KWARGS)
+        mock_client.__getitem__.assert_called_once_with("test_database")
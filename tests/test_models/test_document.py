@@ -1,7 +1,8 @@
 import pytest
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timezone
+from pydantic import TypeAdapter, ValidationError
 
+from tests.conftest import FROZEN_OID, FROZEN_OID_STR, FROZEN_TS
 from src.models.document import (
     PyObjectId,
     DocumentMetadata,
@@ -18,47 +19,41 @@ from src.models.document import (
 class TestPyObjectId:
     """Test suite for PyObjectId custom type"""
     
-    def test_pyobjectid_valid_string(self):
-        """Test PyObjectId validation with valid ObjectId string"""
-        # Arrange
-        valid_id = str(ObjectId())
-        
-        # Act
-        result = PyObjectId.validate(valid_id)
-        
-        # Assert
-        assert isinstance(result, str)
-        assert result == valid_id
+    adapter = TypeAdapter(PyObjectId)
     
-    def test_pyobjectid_valid_objectid(self):
-        """Test PyObjectId validation with ObjectId instance"""
-        # Arrange
-        valid_id = ObjectId()
-        
+    @pytest.mark.parametrize("value, raises", [
+        (FROZEN_OID_STR, False),  # ObjectId string
+        (FROZEN_OID, False),  # ObjectId instance
+        ("invalid_objectid_string", True),
+    ], ids=["valid_string", "valid_objectid", "invalid_string"])
+    def test_pyobjectid_validation(self, value, raises):
+        """Test PyObjectId validation of strings and ObjectId instances"""
+        # Act & Assert
+        if raises:
+            with pytest.raises(ValidationError) as exc_info:
+                self.adapter.validate_python(value)
+            assert "Invalid ObjectId" in str(exc_info.value)
+        else:
+            result = self.adapter.validate_python(value)
+            assert isinstance(result, str)
+            assert result == str(value)
+    
+    @pytest.mark.parametrize("value, expected", [
+        ("507F1F77BCF86CD799439011", "507f1f77bcf86cd799439011"),
+        (b"abcdefghijkl", "6162636465666768696a6b6c"),
+    ], ids=["uppercase_hex", "twelve_bytes"])
+    def test_pyobjectid_normalizes_to_lowercase_hex(self, value, expected):
+        """Test PyObjectId returns the canonical hex form of any valid ObjectId input"""
         # Act
-        result = PyObjectId.validate(valid_id)
+        result = self.adapter.validate_python(value)
         
         # Assert
-        assert isinstance(result, str)
-        assert result == str(valid_id)
-    
-    def test_pyobjectid_invalid_string_raises_error(self):
-        """Test PyObjectId validation with invalid string"""
-        # Arrange
-        invalid_id = "invalid_objectid_string"
-        
-        # Act & Assert
-        with pytest.raises(ValueError) as exc_info:
-            PyObjectId.validate(invalid_id)
-        assert "Invalid ObjectId" in str(exc_info.value)
+        assert result == expected
     
     def test_pyobjectid_json_schema_modification(self):
         """Test PyObjectId JSON schema modification"""
-        # Arrange
-        field_schema = {}
-        
         # Act
-        PyObjectId.__modify_schema__(field_schema)
+        field_schema = self.adapter.json_schema()
         
         # Assert
         assert field_schema["type"] == "string"
@@ -156,16 +151,13 @@ class TestDocumentChunk:
 class TestDocument:
     """Test suite for Document model"""
     
-    def test_document_creation_with_minimal_fields(self, sample_metadata):
+    def test_document_creation_with_minimal_fields(self, base_metadata):
         """Test Document creation with minimal required fields"""
-        # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        
         # Act
         document = Document(
             title="Test Document",
             content="Sample content",
-            metadata=metadata
+            metadata=base_metadata
         )
         
         # Assert
@@ -173,26 +165,17 @@ class TestDocument:
         assert document.content == "Sample content"
         assert document.status == "processing"  # Default value
         assert isinstance(document.uploaded_at, datetime)
+        assert document.uploaded_at.tzinfo == timezone.utc
         assert document.processed_at is None
         assert document.user_id is None
         assert len(document.chunks) == 0
     
-    def test_document_creation_with_all_fields(self, sample_metadata):
+    def test_document_creation_with_all_fields(self, base_metadata, base_chunk, time_travel):
         """Test Document creation with all fields populated"""
         # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        chunks = [
-            DocumentChunk(
-                index=0,
-                content="Chunk 1",
-                start_position=0,
-                end_position=7,
-                word_count=2,
-                character_count=7
-            )
-        ]
-        upload_time = datetime.utcnow()
-        process_time = datetime.utcnow()
+        chunks = [base_chunk]
+        upload_time = FROZEN_TS
+        process_time = time_travel
         
         # Act
         document = Document(
@@ -203,7 +186,7 @@ class TestDocument:
             user_id="user_123",
             uploaded_at=upload_time,
             processed_at=process_time,
-            metadata=metadata,
+            metadata=base_metadata,
             status="completed"
         )
         
@@ -216,144 +199,106 @@ class TestDocument:
         assert document.processed_at == process_time
         assert document.status == "completed"
     
-    def test_document_objectid_handling(self, sample_metadata):
+    def test_document_objectid_handling(self, base_metadata):
         """Test Document ObjectId field handling"""
         # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        custom_id = ObjectId()
+        custom_id = FROZEN_OID
         
         # Act
         document = Document(
             id=str(custom_id),
             title="Test Document",
             content="Sample content",
-            metadata=metadata
+            metadata=base_metadata
         )
         
         # Assert
         assert document.id == str(custom_id)
         assert isinstance(document.id, str)
     
-    def test_document_json_serialization(self, sample_metadata):
+    def test_document_json_serialization(self, base_metadata):
         """Test Document JSON serialization with ObjectId"""
         # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
         document = Document(
             title="Test Document",
             content="Sample content",
-            metadata=metadata
+            metadata=base_metadata
         )
         
         # Act
-        json_data = document.model_dump_json()
+        payload = document.model_dump(mode="json", exclude_none=True)
         
         # Assert
-        assert '"title":"Test Document"' in json_data
-        assert '"status":"processing"' in json_data
+        assert payload["title"] == "Test Document"
+        assert payload["status"] == "processing"
         # ObjectId should be serialized as string
-        assert '"id":' in json_data
-
-class TestDocumentResponse:
-    """Test suite for DocumentResponse model"""
-    
-    def test_document_response_creation(self, sample_metadata):
-        """Test DocumentResponse creation"""
-        # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        upload_time = datetime.utcnow()
-        
-        # Act
-        response = DocumentResponse(
-            id=str(ObjectId()),
-            title="Response Document",
-            chunks_count=5,
-            uploaded_at=upload_time,
-            metadata=metadata,
-            status="completed"
-        )
-        
-        # Assert
-        assert response.title == "Response Document"
-        assert response.chunks_count == 5
-        assert response.uploaded_at == upload_time
-        assert response.status == "completed"
-        assert response.summary is None  # Optional field
+        assert isinstance(payload["id"], str)
 
-class TestDocumentUploadResponse:
-    """Test suite for DocumentUploadResponse model"""
-    
-    def test_document_upload_response_creation(self):
-        """Test DocumentUploadResponse creation"""
-        # Act
-        response = DocumentUploadResponse(
-            document_id=str(ObjectId()),
-            filename="uploaded_file.txt",
-            status="processed",
-            chunks_count=3,
-            message="Upload successful"
-        )
-        
-        # Assert
-        assert response.filename == "uploaded_file.txt"
-        assert response.status == "processed"
-        assert response.chunks_count == 3
-        assert response.message == "Upload successful"
+def _resolve_fixtures(request, fixtures):
+    """Look up fixture-backed field values, a list of names gives a list of values"""
+    resolved = {}
+    for field, name in fixtures.items():
+        if isinstance(name, list):
+            resolved[field] = [request.getfixturevalue(n) for n in name]
+        else:
+            resolved[field] = request.getfixturevalue(name)
+    return resolved
 
-class TestDocumentListResponse:
-    """Test suite for DocumentListResponse model"""
+class TestResponseModels:
+    """Test suite for the response and request models built from plain fields"""
     
-    def test_document_list_response_creation(self, sample_metadata):
-        """Test DocumentListResponse creation"""
+    @pytest.mark.parametrize("model_cls, kwargs, fixtures, expected", [
+        (
+            DocumentResponse,
+            {"id": FROZEN_OID_STR, "title": "Response Document", "chunks_count": 5,
+             "uploaded_at": FROZEN_TS, "status": "completed"},
+            {"metadata": "base_metadata"},
+            {"summary": None}  # Optional field
+        ),
+        (
+            DocumentUploadResponse,
+            {"document_id": FROZEN_OID_STR, "filename": "uploaded_file.txt", "status": "processed",
+             "chunks_count": 3, "message": "Upload successful"},
+            {},
+            {}
+        ),
+        (
+            DocumentListResponse,
+            {"total": 1, "page": 1, "per_page": 20, "has_next": False, "has_prev": False},
+            {"documents": ["base_response"]},
+            {}
+        ),
+        (
+            DocumentSearchResponse,
+            {"total_results": 1, "query": "test query", "took_ms": 150},
+            {"documents": ["base_response"]},
+            {}
+        ),
+        (
+            DocumentProcessingRequest,
+            {"text": "Text to process", "filename": "process_me.txt", "file_type": "text/plain",
+             "user_id": "user_456"},
+            {},
+            {"processing_options": None}
+        ),
+    ], ids=[
+        "DocumentResponse",
+        "DocumentUploadResponse",
+        "DocumentListResponse",
+        "DocumentSearchResponse",
+        "DocumentProcessingRequest"
+    ])
+    def test_model_creation(self, request, model_cls, kwargs, fixtures, expected):
+        """Test that each model keeps the given fields and fills the expected defaults"""
         # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        documents = [
-            DocumentResponse(
-                id=str(ObjectId()),
-                title="Document 1",
-                chunks_count=2,
-                uploaded_at=datetime.utcnow(),
-                metadata=metadata,
-                status="completed"
-            )
-        ]
-        
-        # Act
-        response = DocumentListResponse(
-            documents=documents,
-            total=1,
-            page=1,
-            per_page=20,
-            has_next=False,
-            has_prev=False
-        )
+        fields = {**kwargs, **_resolve_fixtures(request, fixtures)}
         
-        # Assert
-        assert len(response.documents) == 1
-        assert response.total == 1
-        assert response.page == 1
-        assert response.per_page == 20
-        assert response.has_next is False
-        assert response.has_prev is False
-
-class TestDocumentProcessingRequest:
-    """Test suite for DocumentProcessingRequest model"""
-    
-    def test_document_processing_request_creation(self):
-        """Test DocumentProcessingRequest creation"""
         # Act
-        request = DocumentProcessingRequest(
-            text="Text to process",
-            filename="process_me.txt",
-            file_type="text/plain",
-            user_id="user_456"
-        )
+        model = model_cls(**fields)
         
         # Assert
-        assert request.text == "Text to process"
-        assert request.filename == "process_me.txt"
-        assert request.file_type == "text/plain"
-        assert request.user_id == "user_456"
-        assert request.processing_options is None
+        for field, value in {**fields, **expected}.items():
+            assert getattr(model, field) == value
 
 class TestDocumentSearchRequest:
     """Test suite for DocumentSearchRequest model"""
@@ -387,35 +332,3 @@ class TestDocumentSearchRequest:
         assert request.filters == {"language": "en"}
         assert request.limit == 10
         assert request.skip == 5
-
-class TestDocumentSearchResponse:
-    """Test suite for DocumentSearchResponse model"""
-    
-    def test_document_search_response_creation(self, sample_metadata):
-        """Test DocumentSearchResponse creation"""
-        # Arrange
-        metadata = DocumentMetadata(**sample_metadata)
-        documents = [
-            DocumentResponse(
-                id=str(ObjectId()),
-                title="Search Result 1",
-                chunks_count=1,
-                uploaded_at=datetime.utcnow(),
-                metadata=metadata,
-                status="completed"
-            )
-        ]
-        
-        # Act
-        response = DocumentSearchResponse(
-            documents=documents,
-            total_results=1,
-            query="test query",
-            took_ms=150
-        )
-        
-        # Assert
-        assert len(response.documents) == 1
-        assert response.total_results == 1
-        assert response.query == "test query"
-        assert response.took_ms == 150
\ No newline at end of file
@@ -1,9 +1,30 @@
 import pytest
 from unittest.mock import patch, MagicMock, mock_open
 import io
+import codecs
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import zipfile
+import zlib
 
-from src.services.text_extractor import TextExtractor
+from src.services.text_extractor import (
+    TextExtractor,
+    HAS_SELECTOLAX,
+    HAS_ISAL,
+    TEXT_DETECT_ENCODINGS,
+    isal_zlib,
+    _route_zip_inflate,
+    _configure_zip_backend
+)
+
+def _zip_infos(*names):
+    """ZipInfo entries for the given member names, laid out in the given order"""
+    infos = []
+    for offset, name in enumerate(names):
+        info = zipfile.ZipInfo(name)
+        info.header_offset = offset
+        infos.append(info)
+    return infos
 
 class TestTextExtractor:
     """Test suite for TextExtractor service"""
@@ -13,7 +34,6 @@ class TestTextExtractor:
         """Create TextExtractor instance for testing"""
         return TextExtractor()
     
-    @pytest.mark.asyncio
     async def test_extract_text_plain_text_success(self, extractor, sample_text):
         """Test successful text extraction from plain text file"""
         # Arrange
@@ -27,7 +47,109 @@ class TestTextExtractor:
         # Assert
         assert result == sample_text
     
-    @pytest.mark.asyncio
+    async def test_extract_text_accepts_file_object(self, extractor, sample_text):
+        """Test that text can be extracted from a file-like object instead of bytes"""
+        # Arrange
+        stream = io.BytesIO(sample_text.encode('utf-8'))
+        stream.seek(10)  # Extractor should rewind the stream
+        
+        # Act
+        result = await extractor.extract_text(stream, "test.txt", "text/plain")
+        
+        # Assert
+        assert result == sample_text
+    
+    async def test_extract_text_runs_in_worker_thread(self, extractor):
+        """Test that extraction is offloaded from the event loop thread"""
+        # Arrange
+        calling_threads = []
+        
+        def record_thread(file_content, filename):
+            calling_threads.append(threading.current_thread())
+            return "extracted"
+        
+        extractor.supported_types['text/plain'] = record_thread
+        
+        # Act
+        result = await extractor.extract_text(b"content", "test.txt", "text/plain")
+        
+        # Assert
+        assert result == "extracted"
+        assert calling_threads[0] is not threading.current_thread()
+    
+    async def test_extract_text_reuses_text_of_identical_content(self, extractor, sample_text_bytes):
+        """Test that re-uploading the same content skips extraction"""
+        # Arrange
+        mock_extract_txt = MagicMock(return_value="extracted")
+        extractor.supported_types['text/plain'] = mock_extract_txt
+        
+        # Act
+        first = await extractor.extract_text(sample_text_bytes, "first.txt", "text/plain")
+        second = await extractor.extract_text(io.BytesIO(sample_text_bytes), "second.txt", "text/plain")
+        
+        # Assert
+        assert first == second == "extracted"
+        mock_extract_txt.assert_called_once()
+    
+    async def test_extract_text_cache_evicts_least_recently_used(self, extractor, monkeypatch):
+        """Test that the extracted-text cache stays within its entry limit"""
+        # Arrange
+        monkeypatch.setattr('src.services.text_extractor.EXTRACTION_CACHE_SIZE', 1)
+        mock_extract_txt = MagicMock(side_effect=lambda file_content, filename: file_content.decode())
+        extractor.supported_types['text/plain'] = mock_extract_txt
+        
+        # Act
+        await extractor.extract_text(b"first", "first.txt", "text/plain")
+        await extractor.extract_text(b"second", "second.txt", "text/plain")
+        await extractor.extract_text(b"first", "first.txt", "text/plain")
+        
+        # Assert
+        assert mock_extract_txt.call_count == 3
+        assert list(extractor._text_cache.values()) == ["first"]
+    
+    @patch('src.services.text_extractor.pypdf.PdfReader')
+    async def test_extract_text_pdf_uses_process_pool(self, mock_pdf_reader):
+        """Test that PDFs are handed to the configured pool as raw bytes and parsed once"""
+        # Arrange
+        mock_page = MagicMock()
+        mock_page.extract_text.return_value = "Pooled page"
+        mock_pdf_reader.return_value.pages = [mock_page]
+        
+        # A thread pool shares the patched PdfReader, unlike a real process pool
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            extractor = TextExtractor(process_pool=pool)
+            with patch.object(pool, 'submit', wraps=pool.submit) as mock_submit:
+                # Act
+                result = await extractor.extract_text(io.BytesIO(b"%PDF-1.4"), "test.pdf", "application/pdf")
+        
+        # Assert
+        assert result == "Pooled page"
+        mock_submit.assert_called_once()
+        assert mock_submit.call_args[0][1] == b"%PDF-1.4"
+        mock_pdf_reader.assert_called_once()
+    
+    @patch('src.services.text_extractor.pypdf.PdfReader')
+    async def test_extract_text_large_pdf_splits_pages_across_pool(self, mock_pdf_reader, monkeypatch):
+        """Test that large PDFs are extracted as ordered page ranges in parallel"""
+        # Arrange
+        pages = []
+        for page_num in range(60):
+            page = MagicMock()
+            page.extract_text.return_value = f"Page {page_num}"
+            pages.append(page)
+        mock_pdf_reader.return_value.pages = pages
+        monkeypatch.setattr('src.services.text_extractor.settings.EXTRACTION_WORKERS', 4)
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            extractor = TextExtractor(process_pool=pool)
+            with patch.object(pool, 'submit', wraps=pool.submit) as mock_submit:
+                # Act
+                result = await extractor.extract_text(b"%PDF-1.4", "large.pdf", "application/pdf")
+        
+        # Assert
+        assert result == "\n\n".join(f"Page {page_num}" for page_num in range(60))
+        assert [call[0][2:] for call in mock_submit.call_args_list] == [(4,), (15, 30), (30, 45), (45, 60)]
+    
     async def test_extract_text_unsupported_type_raises_error(self, extractor):
         """Test that unsupported file types raise ValueError"""
         # Arrange
@@ -40,7 +162,6 @@ class TestTextExtractor:
             await extractor.extract_text(content, filename, content_type)
         assert "Unsupported file type" in str(exc_info.value)
     
-    @pytest.mark.asyncio
     async def test_extract_text_empty_content_raises_error(self, extractor):
         """Test that empty content raises error"""
         # Arrange
@@ -53,9 +174,8 @@ class TestTextExtractor:
             await extractor.extract_text(content, filename, content_type)
         assert "No text content found" in str(exc_info.value)
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.pypdf.PdfReader')
-    async def test_extract_from_pdf_success(self, mock_pdf_reader, extractor, sample_pdf_text):
+    def test_extract_from_pdf_success(self, mock_pdf_reader, extractor, sample_pdf_text):
         """Test successful PDF text extraction"""
         # Arrange
         content = b"%PDF-1.4 fake pdf content"
@@ -72,7 +192,7 @@ class TestTextExtractor:
         mock_pdf_reader.return_value = mock_reader_instance
         
         # Act
-        result = await extractor._extract_from_pdf(content, filename)
+        result = extractor._extract_from_pdf(content, filename)
         
         # Assert
         assert "Page 1 content" in result
@@ -80,9 +200,8 @@ class TestTextExtractor:
         assert "\n\n" in result  # Pages should be separated
         mock_pdf_reader.assert_called_once()
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.pypdf.PdfReader')
-    async def test_extract_from_pdf_handles_page_extraction_errors(self, mock_pdf_reader, extractor):
+    def test_extract_from_pdf_handles_page_extraction_errors(self, mock_pdf_reader, extractor):
         """Test PDF extraction handles individual page errors gracefully"""
         # Arrange
         content = b"%PDF-1.4 fake pdf content"
@@ -99,15 +218,14 @@ class TestTextExtractor:
         mock_pdf_reader.return_value = mock_reader_instance
         
         # Act
-        result = await extractor._extract_from_pdf(content, filename)
+        result = extractor._extract_from_pdf(content, filename)
         
         # Assert
         assert "Page 1 content" in result
         assert result == "Page 1 content"  # Only successful page content
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.pypdf.PdfReader')
-    async def test_extract_from_pdf_no_readable_text_raises_error(self, mock_pdf_reader, extractor):
+    def test_extract_from_pdf_no_readable_text_raises_error(self, mock_pdf_reader, extractor):
         """Test PDF extraction raises error when no text can be extracted"""
         # Arrange
         content = b"%PDF-1.4 fake pdf content"
@@ -123,12 +241,72 @@ class TestTextExtractor:
         
         # Act & Assert
         with pytest.raises(Exception) as exc_info:
-            await extractor._extract_from_pdf(content, filename)
+            extractor._extract_from_pdf(content, filename)
         assert "No readable text found in PDF" in str(exc_info.value)
     
-    @pytest.mark.asyncio
+    def test_extract_from_pdf_uses_pdfium_when_available(self, extractor, monkeypatch):
+        """Test that PDFium is used for PDF pages when pypdfium2 is installed"""
+        # Arrange
+        mock_pdfium = MagicMock()
+        mock_document = mock_pdfium.PdfDocument.return_value
+        mock_document.__len__.return_value = 2
+        mock_pages = [
+            MagicMock(**{"get_textpage.return_value.get_text_range.return_value": f"Page {page_num + 1} content"})
+            for page_num in range(2)
+        ]
+        mock_document.__getitem__.side_effect = mock_pages.__getitem__
+        monkeypatch.setattr('src.services.text_extractor.settings.PDF_BACKEND', 'pypdfium2')
+        monkeypatch.setattr('src.services.text_extractor.HAS_PDFIUM', True)
+        monkeypatch.setattr('src.services.text_extractor.pdfium', mock_pdfium)
+        
+        # Act
+        result = extractor._extract_from_pdf(b"%PDF-1.4 fake pdf content", "test.pdf")
+        
+        # Assert
+        assert result == "Page 1 content\n\nPage 2 content"
+        mock_pdfium.PdfDocument.assert_called_once()
+        mock_document.close.assert_called_once()
+        for mock_page in mock_pages:
+            mock_page.get_textpage.return_value.close.assert_called_once()
+            mock_page.close.assert_called_once()
+        
+    @patch('src.services.text_extractor.pypdf.PdfReader')
+    def test_extract_from_pdf_ignores_pdfium_unless_selected(self, mock_pdf_reader, extractor, monkeypatch):
+        """Test that an installed pypdfium2 is only used when PDF_BACKEND selects it"""
+        # Arrange
+        mock_pdfium = MagicMock()
+        mock_pdf_reader.return_value.pages = [MagicMock(**{"extract_text.return_value": "Page 1 content"})]
+        monkeypatch.setattr('src.services.text_extractor.settings.PDF_BACKEND', 'pypdf')
+        monkeypatch.setattr('src.services.text_extractor.HAS_PDFIUM', True)
+        monkeypatch.setattr('src.services.text_extractor.pdfium', mock_pdfium)
+        
+        # Act
+        result = extractor._extract_from_pdf(b"%PDF-1.4 fake pdf content", "test.pdf")
+        
+        # Assert
+        assert result == "Page 1 content"
+        mock_pdfium.PdfDocument.assert_not_called()
+    
+    def test_extract_pdf_head_closes_pdfium_document(self, extractor, monkeypatch):
+        """Test that the first page range is returned with the page count and frees the PDFium document"""
+        # Arrange
+        mock_pdfium = MagicMock()
+        mock_document = mock_pdfium.PdfDocument.return_value
+        mock_document.__len__.return_value = 60
+        monkeypatch.setattr('src.services.text_extractor.settings.PDF_BACKEND', 'pypdfium2')
+        monkeypatch.setattr('src.services.text_extractor.HAS_PDFIUM', True)
+        monkeypatch.setattr('src.services.text_extractor.pdfium', mock_pdfium)
+        
+        # Act
+        pages, page_count = extractor._extract_pdf_head(b"%PDF-1.4 fake pdf content", 4)
+        
+        # Assert
+        assert len(pages) == 15
+        assert page_count == 60
+        mock_document.close.assert_called_once()
+    
     @patch('src.services.text_extractor.zipfile.ZipFile')
-    async def test_extract_from_epub_success(self, mock_zipfile, extractor):
+    def test_extract_from_epub_success(self, mock_zipfile, extractor):
         """Test successful EPUB text extraction"""
         # Arrange
         content = b"PK fake epub content"
@@ -136,25 +314,96 @@ class TestTextExtractor:
         
         # Mock ZIP file with HTML content
         mock_zip_instance = MagicMock()
-        mock_zip_instance.namelist.return_value = ["content.html", "chapter1.xhtml", "styles.css"]
-        mock_zip_instance.read.side_effect = lambda name: {
+        mock_zip_instance.infolist.return_value = _zip_infos("content.html", "chapter1.xhtml", "styles.css")
+        mock_zip_instance.open.side_effect = lambda info: io.BytesIO({
             "content.html": b"<html><body><h1>Title</h1><p>Content 1</p></body></html>",
             "chapter1.xhtml": b"<html><body><p>Chapter 1 content</p></body></html>"
-        }.get(name, b"")
+        }.get(info.filename, b""))
         
         mock_zipfile.return_value.__enter__.return_value = mock_zip_instance
         
         # Act
-        result = await extractor._extract_from_epub(content, filename)
+        result = extractor._extract_from_epub(content, filename)
         
         # Assert
         assert "Title" in result
         assert "Content 1" in result
         assert "Chapter 1 content" in result
+        mock_zip_instance.read.assert_not_called()
+    
+    def test_extract_from_epub_reads_chapters_in_archive_order(self, extractor):
+        """Test that chapters are read in the order their data is stored"""
+        # Arrange
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_file:
+            zip_file.writestr("chapter2.xhtml", "<p>Second</p>")
+            zip_file.writestr("chapter1.xhtml", "<p>First</p>")
+        
+        # Act
+        result = extractor._extract_from_epub(buffer.getvalue(), "test.epub")
+        
+        # Assert
+        assert result == "Second\n\nFirst"
+    
+    def test_route_zip_inflate_decompresses_members_with_given_module(self, extractor, monkeypatch):
+        """Test that EPUB members are inflated by the module routed into zipfile"""
+        # Arrange
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("chapter1.xhtml", "<p>First</p>")
+        inflate_zlib = MagicMock(decompressobj=MagicMock(wraps=zlib.decompressobj), crc32=zlib.crc32)
+        monkeypatch.setattr(zipfile, 'zlib', zipfile.zlib)
+        monkeypatch.setattr(zipfile, 'crc32', zipfile.crc32)
+        
+        # Act
+        _route_zip_inflate(inflate_zlib)
+        result = extractor._extract_from_epub(buffer.getvalue(), "test.epub")
+        
+        # Assert
+        assert result == "First"
+        inflate_zlib.decompressobj.assert_called_once_with(-15)
+        assert zipfile.zlib.compressobj is zlib.compressobj
+    
+    @pytest.mark.parametrize("backend", ["zlib", "isal-typo", "zlib-ng"])
+    def test_configure_zip_backend_leaves_zipfile_without_opt_in(self, backend, monkeypatch):
+        """Test that zipfile keeps stdlib zlib unless an installed backend is selected"""
+        # Arrange
+        monkeypatch.setattr('src.services.text_extractor.HAS_ZLIB_NG', False)
+        monkeypatch.setattr(zipfile, 'zlib', zipfile.zlib)
+        monkeypatch.setattr(zipfile, 'crc32', zipfile.crc32)
+        
+        # Act
+        selected = _configure_zip_backend(backend)
+        
+        # Assert
+        assert selected == "zlib"
+        assert zipfile.zlib is zlib
+        assert zipfile.crc32 is zlib.crc32
+    
+    @pytest.mark.skipif(not HAS_ISAL, reason="isal not installed")
+    def test_isal_backend_round_trips_zip_members(self, monkeypatch):
+        """Test that ISA-L inflates members read in small pieces, as zipfile streams them"""
+        # Arrange
+        payload = b"".join(b"chapter %d lorem ipsum dolor sit amet\n" % index for index in range(50000))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("chapter1.xhtml", payload)
+        monkeypatch.setattr(zipfile, 'zlib', zipfile.zlib)
+        monkeypatch.setattr(zipfile, 'crc32', zipfile.crc32)
+        
+        # Act
+        assert _configure_zip_backend("isal") == "isal"
+        with zipfile.ZipFile(buffer) as zip_file:
+            with zip_file.open("chapter1.xhtml") as entry:
+                pieces = iter(lambda: entry.read(1000), b"")
+                result = b"".join(pieces)
+        
+        # Assert
+        assert zipfile.zlib.decompressobj is isal_zlib.decompressobj
+        assert result == payload
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.zipfile.ZipFile')
-    async def test_extract_from_epub_no_html_files_raises_error(self, mock_zipfile, extractor):
+    def test_extract_from_epub_no_html_files_raises_error(self, mock_zipfile, extractor):
         """Test EPUB extraction raises error when no HTML files found"""
         # Arrange
         content = b"PK fake epub content"
@@ -162,30 +411,28 @@ class TestTextExtractor:
         
         # Mock ZIP file with no HTML files
         mock_zip_instance = MagicMock()
-        mock_zip_instance.namelist.return_value = ["META-INF/container.xml", "styles.css"]
+        mock_zip_instance.infolist.return_value = _zip_infos("META-INF/container.xml", "styles.css")
         
         mock_zipfile.return_value.__enter__.return_value = mock_zip_instance
         
         # Act & Assert
         with pytest.raises(Exception) as exc_info:
-            await extractor._extract_from_epub(content, filename)
+            extractor._extract_from_epub(content, filename)
         assert "No readable content files found in EPUB" in str(exc_info.value)
     
-    @pytest.mark.asyncio
-    async def test_extract_from_txt_utf8_encoding(self, extractor, sample_text):
+    def test_extract_from_txt_utf8_encoding(self, extractor, sample_text):
         """Test text extraction with UTF-8 encoding"""
         # Arrange
         content = sample_text.encode('utf-8')
         filename = "test.txt"
         
         # Act
-        result = await extractor._extract_from_txt(content, filename)
+        result = extractor._extract_from_txt(content, filename)
         
         # Assert
         assert result == sample_text
     
-    @pytest.mark.asyncio
-    async def test_extract_from_txt_tries_multiple_encodings(self, extractor):
+    def test_extract_from_txt_tries_multiple_encodings(self, extractor):
         """Test that text extraction tries multiple encodings"""
         # Arrange
         text_with_special_chars = "Café résumé naïve"
@@ -193,20 +440,69 @@ class TestTextExtractor:
         filename = "test.txt"
         
         # Act
-        result = await extractor._extract_from_txt(content, filename)
+        result = extractor._extract_from_txt(content, filename)
         
         # Assert
         assert result == text_with_special_chars
     
-    @pytest.mark.asyncio
-    async def test_extract_from_txt_unsupported_encoding_raises_error(self, extractor):
+    def test_extract_from_txt_uses_charset_detector_for_non_utf8(self, extractor, monkeypatch):
+        """Test that non UTF-8 text is decoded with the detected charset when available"""
+        # Arrange
+        content = "Café résumé".encode('cp1252')
+        mock_from_bytes = MagicMock()
+        mock_from_bytes.return_value.best.return_value = MagicMock(
+            encoding="cp1252", __str__=lambda self: "Café résumé"
+        )
+        monkeypatch.setattr('src.services.text_extractor.HAS_CHARSET_NORMALIZER', True)
+        monkeypatch.setattr('src.services.text_extractor.from_bytes', mock_from_bytes)
+        
+        # Act
+        result = extractor._extract_from_txt(content, "test.txt")
+        
+        # Assert
+        assert result == "Café résumé"
+        mock_from_bytes.assert_called_once_with(content, cp_isolation=TEXT_DETECT_ENCODINGS)
+    
+    def test_extract_from_txt_ignores_detected_charset_outside_western_set(self, extractor, monkeypatch):
+        """Test that a detector guess outside the Western encodings falls back to the ladder"""
+        # Arrange
+        content = "Café résumé naïve".encode('latin-1')
+        mock_from_bytes = MagicMock()
+        mock_from_bytes.return_value.best.return_value = MagicMock(
+            encoding="cp1006", __str__=lambda self: "Cafﻠ rﻠsumﻠ naﺅve"
+        )
+        monkeypatch.setattr('src.services.text_extractor.HAS_CHARSET_NORMALIZER', True)
+        monkeypatch.setattr('src.services.text_extractor.from_bytes', mock_from_bytes)
+        
+        # Act
+        result = extractor._extract_from_txt(content, "test.txt")
+        
+        # Assert
+        assert result == "Café résumé naïve"
+    
+    @pytest.mark.parametrize("encoding", ['utf-8-sig', 'utf-16', 'utf-16-be', 'utf-32'])
+    def test_extract_from_txt_uses_byte_order_mark(self, extractor, encoding):
+        """Test that a byte order mark selects the codec and is stripped"""
+        # Arrange
+        text = "Café résumé naïve"
+        content = text.encode(encoding)
+        if encoding == 'utf-16-be':
+            content = codecs.BOM_UTF16_BE + content
+        
+        # Act
+        result = extractor._extract_from_txt(content, "test.txt")
+        
+        # Assert
+        assert result == text
+    
+    def test_extract_from_txt_unsupported_encoding_raises_error(self, extractor):
         """Test that unsupported encoding raises error"""
         # Arrange
         content = b'some content'
         filename = "test.txt"
         
         # Mock the method to simulate all encodings failing
-        async def mock_extract_txt(file_content, filename):
+        def mock_extract_txt(file_content, filename):
             # Simulate the actual logic but force all encodings to fail
             encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
             for encoding in encodings:
@@ -217,12 +513,11 @@ class TestTextExtractor:
         # Act & Assert
         with patch.object(extractor, '_extract_from_txt', mock_extract_txt):
             with pytest.raises(Exception) as exc_info:
-                await extractor._extract_from_txt(content, filename)
+                extractor._extract_from_txt(content, filename)
             assert "Could not decode text file" in str(exc_info.value)
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.DocxDocument')
-    async def test_extract_from_docx_success(self, mock_docx_document, extractor):
+    def test_extract_from_docx_success(self, mock_docx_document, extractor):
         """Test successful DOCX text extraction"""
         # Arrange
         content = b"PK fake docx content"
@@ -248,16 +543,15 @@ class TestTextExtractor:
         mock_docx_document.return_value = mock_doc_instance
         
         # Act
-        result = await extractor._extract_from_docx(content, filename)
+        result = extractor._extract_from_docx(content, filename)
         
         # Assert
         assert "Paragraph 1 text" in result
         assert "Paragraph 2 text" in result
         assert "Table cell text" in result
     
-    @pytest.mark.asyncio
     @patch('src.services.text_extractor.DocxDocument')
-    async def test_extract_from_docx_empty_document_raises_error(self, mock_docx_document, extractor):
+    def test_extract_from_docx_empty_document_raises_error(self, mock_docx_document, extractor):
         """Test DOCX extraction raises error for empty document"""
         # Arrange
         content = b"PK fake docx content"
@@ -272,7 +566,7 @@ class TestTextExtractor:
         
         # Act & Assert
         with pytest.raises(Exception) as exc_info:
-            await extractor._extract_from_docx(content, filename)
+            extractor._extract_from_docx(content, filename)
         assert "No readable text found in DOCX" in str(exc_info.value)
     
     def test_extract_text_from_html_removes_tags(self, extractor):
@@ -324,6 +618,18 @@ class TestTextExtractor:
         assert "<Hello & goodbye>" in result
         assert '"world"' in result
     
+    @pytest.mark.skipif(not HAS_SELECTOLAX, reason="selectolax not installed")
+    def test_extract_text_from_html_tree_matches_regex_output(self, extractor):
+        """Test that the selectolax path strips markup like the regex fallback"""
+        # Arrange
+        html_content = "<html><head><style>p {}</style></head><body><p>Visible &amp; <b>bold</b></p><script>x()</script></body></html>"
+        
+        # Act
+        result = extractor._extract_text_from_html_tree(html_content)
+        
+        # Assert
+        assert result == "Visible & bold"
+    
     def test_get_supported_types_returns_list(self, extractor):
         """Test that get_supported_types returns the expected file types"""
         # Act
@@ -1,10 +1,16 @@
 import pytest
+import logging
+import threading
+import time
+import io
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
 
 from src.utils.file_validator import (
     validate_file,
     validate_file_content,
+    validate_files_batch,
+    validate_stream_size,
     sanitize_filename,
     get_file_info,
     FileValidationError,
@@ -154,21 +160,123 @@ class TestFileValidator:
             # Act & Assert
             with pytest.raises(HTTPException) as exc_info:
                 validate_file_content(content, filename)
+            assert exc_info.value.status_code == 413
             assert "exceeds maximum allowed size" in str(exc_info.value.detail)
     
     @patch('src.utils.file_validator.HAS_MAGIC', True)
+    @patch('src.utils.file_validator._magic_local', new_callable=threading.local)
     @patch('src.utils.file_validator.magic')
-    def test_validate_file_content_with_magic_detection(self, mock_magic, mock_settings, sample_text):
+    def test_validate_file_content_with_magic_detection(self, mock_magic, _, mock_settings, sample_text):
         """Test file content validation with magic type detection"""
         # Arrange
         content = sample_text.encode('utf-8')
         filename = "test.txt"
-        mock_magic.from_buffer.return_value = "text/plain"
+        detector = mock_magic.Magic.return_value
+        detector.from_buffer.return_value = "text/plain"
         
         with patch('src.utils.file_validator.settings', mock_settings):
             # Act & Assert - should not raise
             validate_file_content(content, filename)
-            mock_magic.from_buffer.assert_called_once_with(content, mime=True)
+            mock_magic.Magic.assert_called_once_with(mime=True)
+            detector.from_buffer.assert_called_once_with(content[:4096])
+    
+    @patch('src.utils.file_validator.HAS_MAGIC', True)
+    @patch('src.utils.file_validator._magic_local', new_callable=threading.local)
+    @patch('src.utils.file_validator.magic')
+    def test_validate_file_content_reuses_magic_detector(self, mock_magic, _, mock_settings):
+        """Test that the libmagic detector is created once and only sees the header"""
+        # Arrange
+        content = b"A" * 10000
+        mock_magic.Magic.return_value.from_buffer.return_value = "text/plain"
+        
+        with patch('src.utils.file_validator.settings', mock_settings):
+            # Act
+            validate_file_content(content, "first.txt")
+            validate_file_content(content, "second.txt")
+        
+        # Assert
+        mock_magic.Magic.assert_called_once_with(mime=True)
+        for call in mock_magic.Magic.return_value.from_buffer.call_args_list:
+            assert len(call[0][0]) == 4096
+    
+    @patch('src.utils.file_validator.HAS_MAGIC', True)
+    @patch('src.utils.file_validator._magic_local', new_callable=threading.local)
+    @patch('src.utils.file_validator.magic')
+    def test_validate_file_content_skips_magic_when_signature_matches(self, mock_magic, _, mock_settings):
+        """Test that libmagic is not consulted when the header matches the extension's signature"""
+        # Arrange
+        content = b"%PDF-1.4 fake pdf content"
+        
+        with patch('src.utils.file_validator.settings', mock_settings):
+            # Act
+            validate_file_content(content, "document.pdf")
+        
+        # Assert
+        mock_magic.Magic.return_value.from_buffer.assert_not_called()
+    
+    def test_validate_stream_size_within_limit_rewinds(self, mock_settings):
+        """Test that a stream's size is measured without consuming it"""
+        # Arrange
+        stream = io.BytesIO(b"%PDF-1.4 fake pdf content")
+        stream.seek(5)
+        
+        with patch('src.utils.file_validator.settings', mock_settings):
+            # Act
+            size = validate_stream_size(stream)
+        
+        # Assert
+        assert size == 25
+        assert stream.tell() == 0
+    
+    def test_validate_stream_size_exceeds_limit(self, mock_settings):
+        """Test that an oversized stream is rejected before it is read"""
+        # Arrange
+        stream = MagicMock()
+        stream.seek.return_value = 100 * 1024 * 1024
+        
+        with patch('src.utils.file_validator.settings', mock_settings):
+            # Act & Assert
+            with pytest.raises(HTTPException) as exc_info:
+                validate_stream_size(stream)
+            assert exc_info.value.status_code == 413
+            assert "exceeds maximum allowed size" in str(exc_info.value.detail)
+        stream.read.assert_not_called()
+    
+    async def test_validate_files_batch_limits_concurrency(self, mock_settings, sample_text_bytes):
+        """Test that a batch is validated in worker threads, at most max_concurrency at a time"""
+        # Arrange
+        files = [(sample_text_bytes, f"file{index}.txt") for index in range(6)]
+        lock = threading.Lock()
+        active, peak, validated = 0, 0, []
+        
+        def track(file_content, filename):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+                validated.append(filename)
+        
+        with patch('src.utils.file_validator.validate_file_content', side_effect=track):
+            # Act
+            await validate_files_batch(files, max_concurrency=2)
+        
+        # Assert
+        assert sorted(validated) == sorted(filename for _, filename in files)
+        assert peak <= 2
+    
+    async def test_validate_files_batch_raises_validation_error(self, mock_settings, sample_text_bytes):
+        """Test that a failing file in a batch surfaces its HTTP error"""
+        # Arrange
+        files = [(sample_text_bytes, "good.txt"), (b"", "empty.txt")]
+        
+        with patch('src.utils.file_validator.settings', mock_settings):
+            # Act & Assert
+            with pytest.raises(HTTPException) as exc_info:
+                await validate_files_batch(files)
+            assert "File is empty" in str(exc_info.value.detail)
     
     def test_validate_file_content_without_magic(self, mock_settings, sample_text):
         """Test file content validation without magic library"""
@@ -198,6 +306,17 @@ class TestFileValidator:
             with pytest.raises(FileValidationError):
                 _validate_magic_bytes(file_content, filename)
     
+    @pytest.mark.parametrize("file_content,filename", [
+        (b"", "test.pdf"),
+        (b"%PD", "test.pdf"),
+        (b"P", "test.epub"),
+    ])
+    def test_validate_magic_bytes_rejects_truncated_headers(self, file_content, filename):
+        """Test that content shorter than the expected signature is rejected"""
+        # Act & Assert
+        with pytest.raises(FileValidationError):
+            _validate_magic_bytes(file_content, filename)
+    
     @pytest.mark.parametrize("malicious_content", [
         b'\x4D\x5A',  # Windows executable
         b'\x7F\x45\x4C\x46',  # Linux executable
@@ -229,11 +348,12 @@ class TestFileValidator:
         assert result == expected
         assert len(result) <= 255
     
-    def test_get_file_info_returns_complete_info(self, sample_text):
+    def test_get_file_info_returns_complete_info(self, sample_text, caplog):
         """Test that get_file_info returns complete file information"""
         # Arrange
         content = sample_text.encode('utf-8')
         filename = "test.txt"
+        caplog.set_level(logging.DEBUG, logger="src.utils.file_validator")
         
         # Act
         info = get_file_info(content, filename)
@@ -247,11 +367,12 @@ class TestFileValidator:
         assert "first_bytes" in info
         assert isinstance(info["first_bytes"], str)
     
-    def test_get_file_info_empty_file(self):
+    def test_get_file_info_empty_file(self, caplog):
         """Test file info for empty file"""
         # Arrange
         content = b""
         filename = "empty.txt"
+        caplog.set_level(logging.DEBUG, logger="src.utils.file_validator")
         
         # Act
         info = get_file_info(content, filename)
@@ -262,11 +383,12 @@ class TestFileValidator:
         assert info["size_mb"] == 0.0
         assert info["first_bytes"] == ""
     
-    def test_get_file_info_short_file(self):
+    def test_get_file_info_short_file(self, caplog):
         """Test file info for file shorter than 20 bytes"""
         # Arrange
         content = b"short"
         filename = "short.txt"
+        caplog.set_level(logging.DEBUG, logger="src.utils.file_validator")
         
         # Act
         info = get_file_info(content, filename)
@@ -275,6 +397,18 @@ class TestFileValidator:
         assert info["first_bytes"] == content.hex()
         assert len(info["first_bytes"]) == len(content) * 2  # hex encoding
     
+    def test_get_file_info_skips_hex_dump_without_debug(self, caplog):
+        """Test that first_bytes is only computed when debug logging is enabled"""
+        # Arrange
+        caplog.set_level(logging.INFO, logger="src.utils.file_validator")
+        
+        # Act
+        info = get_file_info(memoryview(b"%PDF-1.4 content"), "test.pdf")
+        
+        # Assert
+        assert info["size_bytes"] == 16
+        assert info["first_bytes"] is None
+    
     def test_file_validation_error_inheritance(self):
         """Test that FileValidationError is properly inherited from Exception"""
         # Arrange & Act